@@ -0,0 +1,173 @@
+"""
+Description: Tape-based reverse-mode automatic differentiation. Evaluating a scalar function on Var inputs
+records every operation on a tape; one backward pass over the tape then gives the exact gradient with
+respect to all inputs, at a cost independent of the number of parameters (estimate_gradient needs n + 1
+evaluations of f). Use exp, log, sqrt, logistic and tanh from this module inside f instead of the
+math versions.
+
+Reference: Chapter 8 : Gradient Descent, Chapter 19 : Deep Learning
+"""
+
+import math
+from typing import Callable, List, Tuple, Union
+
+from logistic_newton import logistic as _logistic
+
+Vector = List[float]
+
+class Tape:
+    """Records, for every intermediate value, its parents and the local partial derivatives"""
+    def __init__(self) -> None:
+        self.parents: List[Tuple[int, ...]] = []
+        self.partials: List[Tuple[float, ...]] = []
+
+    def record(self, parents: Tuple[int, ...], partials: Tuple[float, ...]) -> int:
+        self.parents.append(parents)
+        self.partials.append(partials)
+        return len(self.parents) - 1
+
+    def backward(self, output: int) -> List[float]:
+        """Adjoint (d output / d node) of every node on the tape"""
+        adjoints = [0.0] * len(self.parents)
+        adjoints[output] = 1.0
+        # nodes are recorded after their parents, so reverse order is a topological order
+        for node in range(output, -1, -1):
+            adjoint = adjoints[node]
+            if adjoint == 0.0:
+                continue
+            for parent, partial in zip(self.parents[node], self.partials[node]):
+                adjoints[parent] += adjoint * partial
+        return adjoints
+
+Number = Union[float, 'Var']
+
+class Var:
+    """A float that records how it was computed"""
+    __slots__ = ('tape', 'index', 'value')
+
+    def __init__(self, tape: Tape, value: float,
+                 parents: Tuple[int, ...] = (),
+                 partials: Tuple[float, ...] = ()) -> None:
+        self.tape = tape
+        self.value = value
+        self.index = tape.record(parents, partials)
+
+    def _unary(self, value: float, partial: float) -> 'Var':
+        return Var(self.tape, value, (self.index,), (partial,))
+
+    def __add__(self, other: Number) -> 'Var':
+        if isinstance(other, Var):
+            return Var(self.tape, self.value + other.value, (self.index, other.index), (1.0, 1.0))
+        return self._unary(self.value + other, 1.0)
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Number) -> 'Var':
+        if isinstance(other, Var):
+            return Var(self.tape, self.value - other.value, (self.index, other.index), (1.0, -1.0))
+        return self._unary(self.value - other, 1.0)
+
+    def __rsub__(self, other: float) -> 'Var':
+        return self._unary(other - self.value, -1.0)
+
+    def __mul__(self, other: Number) -> 'Var':
+        if isinstance(other, Var):
+            return Var(self.tape, self.value * other.value,
+                       (self.index, other.index), (other.value, self.value))
+        return self._unary(self.value * other, other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Number) -> 'Var':
+        if isinstance(other, Var):
+            return Var(self.tape, self.value / other.value, (self.index, other.index),
+                       (1 / other.value, -self.value / other.value ** 2))
+        return self._unary(self.value / other, 1 / other)
+
+    def __rtruediv__(self, other: float) -> 'Var':
+        return self._unary(other / self.value, -other / self.value ** 2)
+
+    def __pow__(self, power: float) -> 'Var':
+        assert not isinstance(power, Var), "only constant exponents are supported"
+        return self._unary(self.value ** power, power * self.value ** (power - 1))
+
+    def __neg__(self) -> 'Var':
+        return self._unary(-self.value, -1.0)
+
+    def __abs__(self) -> 'Var':
+        return self._unary(abs(self.value), 1.0 if self.value >= 0 else -1.0)
+
+    # comparisons look at the value, so f can branch on it
+    def __lt__(self, other: Number) -> bool: return self.value < _value(other)
+    def __le__(self, other: Number) -> bool: return self.value <= _value(other)
+    def __gt__(self, other: Number) -> bool: return self.value > _value(other)
+    def __ge__(self, other: Number) -> bool: return self.value >= _value(other)
+
+    def __float__(self) -> float:
+        return float(self.value)
+
+    def __repr__(self) -> str:
+        return f"Var({self.value})"
+
+def _value(x: Number) -> float:
+    return x.value if isinstance(x, Var) else x
+
+def exp(x: Number) -> Number:
+    if isinstance(x, Var):
+        e = math.exp(x.value)
+        return x._unary(e, e)
+    return math.exp(x)
+
+def log(x: Number) -> Number:
+    if isinstance(x, Var):
+        return x._unary(math.log(x.value), 1 / x.value)
+    return math.log(x)
+
+def sqrt(x: Number) -> Number:
+    if isinstance(x, Var):
+        s = math.sqrt(x.value)
+        return x._unary(s, 0.5 / s)
+    return math.sqrt(x)
+
+def logistic(x: Number) -> Number:
+    if isinstance(x, Var):
+        y = _logistic(x.value)
+        return x._unary(y, y * (1 - y))
+    return _logistic(x)
+
+def tanh(x: Number) -> Number:
+    if isinstance(x, Var):
+        t = math.tanh(x.value)
+        return x._unary(t, 1 - t * t)
+    return math.tanh(x)
+
+def value_and_gradient(f: Callable[[List[Var]], Number],
+                       v: Vector) -> Tuple[float, Vector]:
+    """f(v) together with its exact gradient, from one forward and one backward pass"""
+    tape = Tape()
+    inputs = [Var(tape, v_i) for v_i in v]
+    output = f(inputs)
+    if not isinstance(output, Var):   # f doesn't depend on its inputs
+        return output, [0.0 for _ in v]
+    adjoints = tape.backward(output.index)
+    return output.value, [adjoints[x.index] for x in inputs]
+
+def gradient(f: Callable[[List[Var]], Number], v: Vector) -> Vector:
+    """Exact gradient of the scalar function f at v"""
+    return value_and_gradient(f, v)[1]
+
+def sum_of_squares(v: List[Number]) -> Number:
+    return sum(v_i * v_i for v_i in v)
+
+assert gradient(sum_of_squares, [1.0, 2.0, 3.0]) == [2.0, 4.0, 6.0]
+
+# squared error of a linear model, compare with multiple_regression.sqerror_gradient
+x, y, beta = [1, 2, 3], 30, [4.0, 4.0, 4.0]
+sqerror = lambda beta: (sum(x_i * b_i for x_i, b_i in zip(x, beta)) - y) ** 2
+assert gradient(sqerror, beta) == [2 * (24 - 30) * x_i for x_i in x]
+
+# negative log likelihood of one point, compare with logistic_regression._negative_log_gradient
+x, y, beta = [1.0, 0.5, -1.5], 1, [0.1, 0.2, 0.3]
+nll = lambda beta: -log(logistic(sum(x_i * b_i for x_i, b_i in zip(x, beta))))
+p = logistic(sum(x_i * b_i for x_i, b_i in zip(x, beta)))
+assert all(abs(g + (y - p) * x_j) < 1e-12 for g, x_j in zip(gradient(nll, beta), x))
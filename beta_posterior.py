@@ -0,0 +1,141 @@
+"""
+Description: Log-space Beta posterior for Bayesian A/B testing. The normalizing constant B(alpha, beta)
+is computed with lgamma (so large alpha/beta don't overflow) and cached per (alpha, beta), and densities,
+CDFs and credible intervals are evaluated over whole grids of points at once.
+
+Reference: Chapter 7 : Hypothesis and Inference
+"""
+
+import math
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+@lru_cache(maxsize=1024)
+def log_B(alpha: float, beta: float) -> float:
+    """log of the normalizing constant B(alpha, beta), cached per (alpha, beta)"""
+    return math.lgamma(alpha) + math.lgamma(beta) - math.lgamma(alpha + beta)
+
+def beta_log_pdf(x: float, alpha: float, beta: float) -> float:
+    """log of the beta density, -inf outside of (0, 1)"""
+    if x <= 0 or x >= 1:          # no weight outside of [0, 1]
+        return -math.inf
+    return ((alpha - 1) * math.log(x) + (beta - 1) * math.log1p(-x)
+            - log_B(alpha, beta))
+
+def beta_pdf(x: float, alpha: float, beta: float) -> float:
+    return math.exp(beta_log_pdf(x, alpha, beta))
+
+def beta_pdf_grid(xs: List[float], alpha: float, beta: float) -> List[float]:
+    """Evaluates the beta density at every point of xs,
+    looking up the normalizer only once"""
+    log_norm = log_B(alpha, beta)
+    return [math.exp((alpha - 1) * math.log(x) + (beta - 1) * math.log1p(-x)
+                     - log_norm) if 0 < x < 1 else 0.0
+            for x in xs]
+
+def _beta_continued_fraction(x: float, alpha: float, beta: float,
+                             max_iter: int = 10000,
+                             tol: float = 1e-14) -> float:
+    """Continued fraction for the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+    qab, qap, qam = alpha + beta, alpha + 1, alpha - 1
+    c = 1.0
+    d = 1 - qab * x / qap
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, max_iter + 1):
+        m2 = 2 * m
+        # even step
+        aa = m * (beta - m) * x / ((qam + m2) * (alpha + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        # odd step
+        aa = -(alpha + m) * (qab + m) * x / ((alpha + m2) * (qap + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < tol:
+            break
+    return h
+
+def beta_cdf(x: float, alpha: float, beta: float) -> float:
+    """P(X <= x) for X ~ Beta(alpha, beta), via the regularized incomplete beta"""
+    if x <= 0: return 0.0
+    if x >= 1: return 1.0
+
+    # log of the prefactor x^a (1-x)^b / B(a, b), computed in log-space
+    log_front = (alpha * math.log(x) + beta * math.log1p(-x)
+                 - log_B(alpha, beta))
+
+    # the continued fraction converges fast on this side of the mean,
+    # use the symmetry I_x(a, b) = 1 - I_{1-x}(b, a) on the other side
+    if x < (alpha + 1) / (alpha + beta + 2):
+        return math.exp(log_front) * _beta_continued_fraction(x, alpha, beta) / alpha
+    else:
+        return 1 - math.exp(log_front) * _beta_continued_fraction(1 - x, beta, alpha) / beta
+
+def beta_cdf_grid(xs: List[float], alpha: float, beta: float) -> List[float]:
+    return [beta_cdf(x, alpha, beta) for x in xs]
+
+def inverse_beta_cdf(p: float, alpha: float, beta: float,
+                     tol: float = 1e-10) -> float:
+    """Finds x with P(X <= x) = p using binary search"""
+    low_x, high_x = 0.0, 1.0
+    while high_x - low_x > tol:
+        mid_x = (low_x + high_x) / 2
+        if beta_cdf(mid_x, alpha, beta) < p:
+            low_x = mid_x
+        else:
+            high_x = mid_x
+    return (low_x + high_x) / 2
+
+def credible_interval(alpha: float, beta: float,
+                      probability: float = 0.95) -> Tuple[float, float]:
+    """Returns the equal-tailed interval containing the specified probability"""
+    tail_probability = (1 - probability) / 2
+    return (inverse_beta_cdf(tail_probability, alpha, beta),
+            inverse_beta_cdf(1 - tail_probability, alpha, beta))
+
+class BetaPosterior(NamedTuple):
+    """Beta(alpha, beta) belief about a conversion rate"""
+    alpha: float = 1.0
+    beta: float = 1.0
+
+    def update(self, successes: int, failures: int) -> 'BetaPosterior':
+        """Conjugate update after observing more trials"""
+        return BetaPosterior(self.alpha + successes, self.beta + failures)
+
+    def mean(self) -> float:
+        return self.alpha / (self.alpha + self.beta)
+
+    def pdf(self, xs: List[float]) -> List[float]:
+        return beta_pdf_grid(xs, self.alpha, self.beta)
+
+    def cdf(self, xs: List[float]) -> List[float]:
+        return beta_cdf_grid(xs, self.alpha, self.beta)
+
+    def credible_interval(self, probability: float = 0.95) -> Tuple[float, float]:
+        return credible_interval(self.alpha, self.beta, probability)
+
+# Beta(1, 1) is the uniform distribution
+assert abs(beta_pdf(0.3, 1, 1) - 1) < 1e-12
+assert abs(beta_cdf(0.3, 1, 1) - 0.3) < 1e-12
+
+# Beta(2, 2) has cdf 3x^2 - 2x^3
+assert abs(beta_cdf(0.25, 2, 2) - (3 * 0.25 ** 2 - 2 * 0.25 ** 3)) < 1e-12
+
+# math.gamma overflows here, the log-space version doesn't
+posterior = BetaPosterior().update(successes=20000, failures=80000)
+lo, hi = posterior.credible_interval(0.95)
+assert lo < posterior.mean() < hi
+assert 0.197 < lo < 0.198 and 0.202 < hi < 0.203
+
+grid = [i / 1000 for i in range(1001)]
+densities = posterior.pdf(grid)
+assert max(densities) == densities[200]
@@ -21,7 +21,8 @@ import random
 
 def cluster_means(k: int,
                  imputs: List[Vector],
-                 assignments: List[int]) -> List[Vector]:
+                 assignments: List[int],
+                 rng: random.Random = random) -> List[Vector]:
     # cluster i contains the inputs whose assignment is i
     clusters = [[] for i in range(k)]
     
@@ -29,7 +30,7 @@ def cluster_means(k: int,
         clusters[assignment].append(input)
         
     # if cluster is empty then just use a random point
-    return [vector_mean(cluster) if cluster else random.choice(inputs)
+    return [vector_mean(cluster) if cluster else rng.choice(inputs)
             for cluster in clusters]
 
 import itertools
@@ -46,15 +47,15 @@ class kMeans:
         return min(range(self.k),
                    key = lambda i: squared_distance(input,self.means[i]))
     
-    def train(self, inputs: List[Vector]) -> None:
+    def train(self, inputs: List[Vector], rng: random.Random = random) -> None:
         # Start with random assignments
-        assignments = [random.randrange(self.k) for _ in inputs]
+        assignments = [rng.randrange(self.k) for _ in inputs]
         #print(inputs[:10])
         #print(assignments[:10])
         with tqdm.tqdm(itertools.count()) as t:
             for _ in t:
                 # Compute means and find new assignments
-                self.means = cluster_means(self.k, inputs, assignments)
+                self.means = cluster_means(self.k, inputs, assignments, rng)
                 #print(self.means)
                 new_assignments = [self.classify(input) for input in inputs]
                 
@@ -66,7 +67,7 @@ class kMeans:
                     return
                 # Otherwise keep the new assignments and compute new means
                 assignments = new_assignments
-                self.means = cluster_means(self.k, inputs, assignments)
+                self.means = cluster_means(self.k, inputs, assignments, rng)
                 t.set_description(f"changed: {num_changed}/{len(inputs)}")
 
 # Example: meetups
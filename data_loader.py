@@ -0,0 +1,198 @@
+"""
+Description: An index-based minibatch loader. Every epoch draws a full permutation of an index array,
+so samples are mixed across batches (minibatches in gradient_descent only shuffles the batch start
+offsets), and batches are lightweight views into the dataset rather than slice copies. Optionally the
+next batch is assembled on a background thread while the current gradient is being computed.
+Works on lists, array-backed vectors and memory-mapped matrices of float64 rows.
+
+Reference: Chapter 8 : Gradient Descent
+"""
+
+import mmap
+import os
+import queue
+import random
+import threading
+from array import array
+from typing import Iterable, Iterator, List, Sequence, TypeVar
+
+T = TypeVar('T')
+
+class BatchView(Sequence):
+    """A read-only view of dataset[indices[start:end]] that doesn't copy any rows"""
+    def __init__(self, dataset: Sequence, indices: Sequence[int], start: int, end: int) -> None:
+        self.dataset = dataset
+        self.indices = indices
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, i: int):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("batch index out of range")
+        return self.dataset[self.indices[self.start + i]]
+
+    def __iter__(self) -> Iterator:
+        dataset, indices = self.dataset, self.indices
+        for k in range(self.start, self.end):
+            yield dataset[indices[k]]
+
+class MmapMatrix(Sequence):
+    """A matrix of float64 rows stored in a binary file. Rows are memoryviews into
+    the mapped file, so reading a row copies nothing until its values are used.
+    close() can only unmap the file once every row has been dropped (or released),
+    so copy out the rows you want to keep, e.g. with list(row). Also a context manager."""
+    def __init__(self, path: str, num_cols: int) -> None:
+        self.num_cols = num_cols
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._mmap = None       # an empty file can't be mapped, it just has no rows
+                self._values = memoryview(array('d'))
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._values = memoryview(self._mmap).cast('d')
+        assert len(self._values) % num_cols == 0, "file size is not a whole number of rows"
+
+    def __len__(self) -> int:
+        return len(self._values) // self.num_cols
+
+    def __getitem__(self, i: int) -> memoryview:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("row index out of range")
+        return self._values[i * self.num_cols:(i + 1) * self.num_cols]
+
+    def close(self) -> None:
+        """Unmaps the file. Raises BufferError if a row returned by [] is still alive."""
+        self._values.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self) -> 'MmapMatrix':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def write_matrix(path: str, rows: List[List[float]]) -> None:
+    """Writes rows as contiguous float64 values, the format MmapMatrix reads"""
+    with open(path, 'wb') as f:
+        for row in rows:
+            array('d', row).tofile(f)
+
+def _batch_views(dataset: Sequence, batch_size: int, indices: Sequence[int]) -> Iterator[BatchView]:
+    n = len(indices)
+    for start in range(0, n, batch_size):
+        yield BatchView(dataset, indices, start, min(start + batch_size, n))
+
+def prefetch_iterator(iterable: Iterable[T], max_ahead: int) -> Iterator[T]:
+    """Yields the items of iterable, producing up to max_ahead of them ahead of time
+    on a background thread (e.g. reading and parsing while the caller computes)"""
+    items: queue.Queue = queue.Queue(maxsize=max_ahead)
+    stop = threading.Event()
+    done = object() # marks the end of the items
+
+    def put(item) -> bool:
+        """Waits for room in the queue, gives up (returns False) once stop is set"""
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # let the worker exit if the caller stopped iterating early
+        stop.set()
+        worker.join()
+
+def index_minibatches(dataset: Sequence[T],
+                      batch_size: int,
+                      shuffle: bool = True,
+                      rng: random.Random = random,
+                      prefetch: int = 0) -> Iterator[Sequence[T]]:
+    """Generate 'batch_size'-sized batches covering one epoch of the data.
+    With prefetch > 0 up to that many batches are assembled into lists ahead of time
+    on a background thread, otherwise the batches are views into the dataset."""
+    # 'q' holds 64-bit indices and takes a fraction of the memory of a list of ints
+    indices = array('q', range(len(dataset)))
+    if shuffle: rng.shuffle(indices)
+
+    if prefetch <= 0:
+        yield from _batch_views(dataset, batch_size, indices)
+        return
+
+    yield from prefetch_iterator((list(view) for view in _batch_views(dataset, batch_size, indices)),
+                                 prefetch)
+
+dataset = [(x, 20 * x + 5) for x in range(-50, 50)]
+batches = list(index_minibatches(dataset, batch_size=20, rng=random.Random(0)))
+assert [len(batch) for batch in batches] == [20] * 5
+assert sorted(row for batch in batches for row in batch) == dataset  # every row exactly once
+assert list(batches[0]) != dataset[:20]                             # mixed across batches
+
+prefetched = list(index_minibatches(dataset, batch_size=20, rng=random.Random(0), prefetch=2))
+assert [list(batch) for batch in batches] == prefetched
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    # stopping early while the background thread waits on a full queue doesn't hang
+    for batch in index_minibatches(list(range(60)), 20, prefetch=2):
+        time.sleep(0.3)   # the thread is now blocked trying to queue the end marker
+        break
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "matrix.bin")
+    write_matrix(path, [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    with MmapMatrix(path, 2) as matrix:
+        assert [list(row) for row in matrix] == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+        last = matrix[-1].tolist()    # a copy, so it outlives the mapping
+    assert last == [5.0, 6.0]
+
+    # a row view that is still alive keeps the file mapped
+    matrix = MmapMatrix(path, 2)
+    row = matrix[0]
+    try:
+        matrix.close()
+        assert False, "close() should have refused while a row is alive"
+    except BufferError:
+        pass
+    del row
+    matrix.close()
+
+    # an empty file is a matrix with no rows
+    write_matrix(path, [])
+    with MmapMatrix(path, 2) as matrix:
+        assert len(matrix) == 0 and list(matrix) == []
+
+    os.remove(path)
+    os.rmdir(directory)
@@ -128,33 +128,35 @@ class Sigmoid(Layer):
 import random
 from probability import inverse_normal_cdf
 
-def random_uniform(*dims: int) -> Tensor:
+def random_uniform(*dims: int, rng: random.Random = random) -> Tensor:
     if len(dims) == 1:
-        return [random.random() for _ in range(dims[0])]
+        return [rng.random() for _ in range(dims[0])]
     else:
-        return [random_uniform(*dims[1:]) for _ in range(dims[0])]
+        return [random_uniform(*dims[1:], rng = rng) for _ in range(dims[0])]
     
 def random_normal(*dims: int,
                  mean: float = 0.0,
-                 variance: float = 1.0) -> Tensor:
+                 variance: float = 1.0,
+                 rng: random.Random = random) -> Tensor:
     if len(dims) == 1:
-        return [mean + variance*inverse_normal_cdf(random.random()) 
+        return [mean + variance*inverse_normal_cdf(rng.random()) 
                 for _ in range(dims[0])]
     else:
-        return [random_normal(*dims[1:], mean = mean, variance = variance)
+        return [random_normal(*dims[1:], mean = mean, variance = variance, rng = rng)
                 for _ in range(dims[0])]
     
 print(random_normal(2,3,4))
 
 
-def random_tensor(*dims: int, init: str = 'normal') -> Tensor:
+def random_tensor(*dims: int, init: str = 'normal',
+                  rng: random.Random = random) -> Tensor:
     if init == 'normal':
-        return random_normal(*dims)
+        return random_normal(*dims, rng = rng)
     elif init == 'uniform':
-        return random_uniform(*dims)
+        return random_uniform(*dims, rng = rng)
     elif init == 'xavier':
         variance = len(dims) / sum(dims)
-        return random_normal(*dims,variance = variance)
+        return random_normal(*dims,variance = variance, rng = rng)
     else:
         raise ValueError(f"unkown init: {init}")
 
@@ -17,7 +17,8 @@ def sum_of_squares(v: Vector) -> float:
     """Computes the sum of squared elements in v"""
     return dot(v,v)
 
-from typing import Callable
+from typing import Callable, List, Optional
+from concurrent.futures import Executor
 def difference_quotient(f: Callable[[float],float],
                        x: float,
                        h: float) -> float:
@@ -43,17 +44,68 @@ plt.show()
 def partial_difference_quotient(f: Callable[[float],float],
                                 v: Vector,
                                 i: int,
-                                h: float) -> float:
-    """Return the partial difference quotient in i-th direction"""
+                                h: float,
+                                f_v: Optional[float] = None) -> float:
+    """Return the partial difference quotient in i-th direction.
+    Pass f_v = f(v) if it is already known to save an evaluation."""
     # Compute the next point in i-th direction
     w = [v_j + (h if i == j else 0) for j, v_j in enumerate(v)]
-    return (f(w) - f(v))/h
+    if f_v is None:
+        f_v = f(v)
+    return (f(w) - f_v)/h
 
-def estimate_gradient(f: Callable[[float], float],
+def _perturbed_values(f: Callable[[Vector], float],
                       v: Vector,
-                      h: float = 0.0001) -> Vector:
-    return [partial_difference_quotient(f, v, i, h) 
-            for i in range(len(v))]
+                      steps: List,
+                      executor: Optional[Executor]) -> List:
+    """Evaluates f at v + step * e_i for every coordinate i and every step,
+    in the order (i=0, steps[0]), (i=0, steps[1]), (i=1, steps[0]), ...
+    Without an executor every call gets the same list, changed in place between calls."""
+    if executor is None:
+        # Reuse a single working copy of v, restoring each coordinate afterwards
+        w = list(v)
+        values = []
+        for i, v_i in enumerate(v):
+            for step in steps:
+                w[i] = v_i + step
+                values.append(f(w))
+            w[i] = v_i
+        return values
+
+    # Every task needs its own point when the evaluations run concurrently
+    points = [[v_j + (step if i == j else 0) for j, v_j in enumerate(v)]
+              for i in range(len(v)) for step in steps]
+    return list(executor.map(f, points))
+
+def estimate_gradient(f: Callable[[Vector], float],
+                      v: Vector,
+                      h: float = 0.0001,
+                      method: str = 'forward',
+                      executor: Optional[Executor] = None) -> Vector:
+    """Estimates the gradient of f at v numerically.
+    method is 'forward' (n + 1 evaluations), 'central' (2n evaluations, O(h^2) error)
+    or 'complex' (n evaluations, f must accept complex inputs, no cancellation error).
+    Pass a thread or process pool as executor to run the evaluations concurrently.
+    f must not modify its argument or keep a reference to it: without an executor the
+    perturbed points share one list that is updated in place between calls."""
+    if method == 'forward':
+        f_v = f(v) # only needs to be computed once
+        values = _perturbed_values(f, v, [h], executor)
+        return [(f_w - f_v)/h for f_w in values]
+    elif method == 'central':
+        values = _perturbed_values(f, v, [h, -h], executor)
+        return [(values[2*i] - values[2*i + 1])/(2*h) for i in range(len(v))]
+    elif method == 'complex':
+        values = _perturbed_values(f, v, [complex(0, h)], executor)
+        return [f_w.imag/h for f_w in values]
+    else:
+        raise ValueError(f"unknown method: {method}")
+
+v = [1.0, 2.0, 3.0]
+assert all(abs(g - 2*v_i) < 0.001 for g, v_i in zip(estimate_gradient(sum_of_squares, v), v))
+assert all(abs(g - 2*v_i) < 1e-6
+           for g, v_i in zip(estimate_gradient(sum_of_squares, v, method='central'), v))
+assert estimate_gradient(sum_of_squares, v, method='complex') == [2.0, 4.0, 6.0]
     
 from vector_operations import scalar_mulitply, distance, add
 import random
@@ -118,12 +170,13 @@ from typing import TypeVar, List, Iterator
 T = TypeVar('T') # this allows us to type generic functions
 def minibatches(dataset: List[T],
                batch_size = int,
-               shuffle: bool = True) -> Iterator[List]:
+               shuffle: bool = True,
+               rng: random.Random = random) -> Iterator[List]:
     """Generate 'batch_size'-sized batches from the data"""
     # create starting indices of the batches
     batch_starts = [start for start in range(0, len(dataset), batch_size)]
     # shuffle the batches
-    if shuffle: random.shuffle(batch_starts)
+    if shuffle: rng.shuffle(batch_starts)
         
     for start in batch_starts:
         end = start + batch_size
@@ -0,0 +1,34 @@
+"""
+Description: Per-example gradient functions with the (x, y, theta) signature used by the minibatch,
+out-of-core and multi-process trainers. They compute the same values as gradient_descent.linear_gradient,
+multiple_regression.sqerror_gradient and logistic_regression._negative_log_gradient, which can't be
+imported without running those scripts' examples. Being defined at module level, they can also be
+pickled and sent to worker processes.
+
+Reference: Chapter 8 : Gradient Descent, Chapter 15 : Multiple Regression, Chapter 16 : Logistic Regression
+"""
+
+from typing import Sequence
+
+from logistic_newton import logistic
+from vector_operations import Vector
+
+def linear_gradient(x: float, y: float, theta: Sequence[float]) -> Vector:
+    """Same as gradient_descent.linear_gradient"""
+    slope, intercept = theta
+    error = (slope*x + intercept) - y
+    return [2*error*x, 2*error]
+
+def sqerror_gradient(x: Vector, y: float, beta: Sequence[float]) -> Vector:
+    """Same as multiple_regression.sqerror_gradient"""
+    error = sum(x_i * beta_i for x_i, beta_i in zip(x, beta)) - y
+    return [2 * error * x_i for x_i in x]
+
+def _negative_log_gradient(x: Vector, y: float, beta: Sequence[float]) -> Vector:
+    """Same as logistic_regression._negative_log_gradient, without overflow for large margins"""
+    error = y - logistic(sum(x_i * beta_i for x_i, beta_i in zip(x, beta)))
+    return [-error * x_j for x_j in x]
+
+assert linear_gradient(1.0, 25.0, [20.0, 5.0]) == [0.0, 0.0]
+assert sqerror_gradient([1.0, 2.0], 5.0, [1.0, 1.0]) == [-4.0, -8.0]
+assert _negative_log_gradient([1.0, 1000.0], 1.0, [0.0, 1.0]) == [-0.0, -0.0]
@@ -0,0 +1,125 @@
+"""
+Description: Logistic regression for sparse, very high dimensional inputs such as words or categorical
+values. Examples are dicts {feature name: value}; the hashing trick maps every name into a fixed-size
+weight array, so there is no vocabulary to build and memory doesn't grow with the number of features.
+L2 regularization is applied lazily through a single shared scale factor, so each SGD step only touches
+the non-zero features of the example.
+
+Reference: Chapter 16 : Logistic Regression
+"""
+
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from logistic_newton import logistic, softplus
+
+Features = Dict[str, float]
+
+def _hash_feature(name: str, num_bits: int) -> Tuple[int, float]:
+    """Bucket index and sign (+1 or -1) of a feature. The sign makes collisions
+    cancel out on average instead of always adding up."""
+    h = zlib.crc32(name.encode())   # unlike hash(), the same in every run
+    return h & ((1 << num_bits) - 1), (1.0 if (h >> 31) & 1 else -1.0)
+
+class HashedLogisticRegression:
+    def __init__(self, num_bits: int = 20,
+                 learning_rate: float = 0.1,
+                 l2: float = 0.0) -> None:
+        # each step multiplies the weights by 1 - learning_rate * l2, which must stay positive
+        assert learning_rate > 0 and l2 >= 0, "learning_rate must be positive and l2 non-negative"
+        assert learning_rate * l2 < 1, "learning_rate * l2 must be below 1"
+        self.num_bits = num_bits
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = array('d', bytes(8 << num_bits))   # 2**num_bits zeros
+        self.scale = 1.0   # the actual weights are scale * self.weights
+        self.bias = 0.0    # not regularized
+
+    def _hashed(self, features: Features) -> List[Tuple[int, float]]:
+        hashed = []
+        for name, value in features.items():
+            if value:
+                index, sign = _hash_feature(name, self.num_bits)
+                hashed.append((index, sign * value))
+        return hashed
+
+    def _margin(self, hashed: List[Tuple[int, float]]) -> float:
+        weights = self.weights
+        return self.bias + self.scale * sum(weights[i] * v for i, v in hashed)
+
+    def predict_proba(self, features: Features) -> float:
+        return logistic(self._margin(self._hashed(features)))
+
+    def predict(self, features: Features, threshold: float = 0.5) -> bool:
+        return self.predict_proba(features) >= threshold
+
+    def update(self, features: Features, y: float) -> None:
+        """One SGD step on the negative log-likelihood (+ l2/2 |w|^2), in O(number of features)"""
+        hashed = self._hashed(features)
+        error = logistic(self._margin(hashed)) - y
+
+        # shrinking every weight by (1 - lr * l2) is just a change of the shared scale
+        if self.l2:
+            self.scale *= 1 - self.learning_rate * self.l2
+            if self.scale < 1e-9:
+                self._rescale()
+
+        step = self.learning_rate * error / self.scale
+        weights = self.weights
+        for i, v in hashed:
+            weights[i] -= step * v
+        self.bias -= self.learning_rate * error
+
+    def _rescale(self) -> None:
+        """Folds the scale back into the weights before it underflows (O(2**num_bits), rare)"""
+        weights, scale = self.weights, self.scale
+        for i in range(len(weights)):
+            if weights[i]:
+                weights[i] *= scale
+        self.scale = 1.0
+
+    def fit(self, examples: Iterable[Tuple[Features, float]], num_epochs: int = 1) -> None:
+        """examples must be re-iterable (e.g. a list) when num_epochs > 1"""
+        for _ in range(num_epochs):
+            for features, y in examples:
+                self.update(features, y)
+
+    def negative_log_likelihood(self, examples: Iterable[Tuple[Features, float]]) -> float:
+        total = 0.0
+        for features, y in examples:
+            z = self._margin(self._hashed(features))
+            total += softplus(z) - y * z
+        return total
+
+def bag_of_words(text: str) -> Features:
+    """One feature per distinct lowercased word"""
+    return {f"word={word}": 1.0 for word in text.lower().split()}
+
+import random
+rng = random.Random(0)
+spammy = ["free", "winner", "cash", "prize", "click", "offer"]
+hammy = ["meeting", "tomorrow", "project", "lunch", "report", "thanks"]
+filler = [f"w{i}" for i in range(5000)]
+
+def random_message(is_spam: bool) -> str:
+    words = rng.sample(spammy if is_spam else hammy, 2) + rng.sample(filler, 8)
+    return " ".join(words)
+
+examples = []
+for _ in range(2000):
+    is_spam = rng.random() < 0.5
+    examples.append((bag_of_words(random_message(is_spam)), 1.0 if is_spam else 0.0))
+
+model = HashedLogisticRegression(num_bits=18, learning_rate=0.2, l2=1e-4)
+model.fit(examples[:1500], num_epochs=3)
+num_correct = sum(model.predict(features) == (y == 1.0) for features, y in examples[1500:])
+assert num_correct / 500 > 0.95
+assert model.predict_proba(bag_of_words("claim your free cash prize")) > 0.9
+
+# a decay factor of 1 - learning_rate * l2 <= 0 would zero or flip every weight
+try:
+    HashedLogisticRegression(num_bits=4, learning_rate=1.0, l2=1.0)
+    assert False, "learning_rate * l2 >= 1 should be rejected"
+except AssertionError as e:
+    assert "below 1" in str(e)
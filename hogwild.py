@@ -0,0 +1,157 @@
+"""
+Description: Hogwild-style asynchronous SGD. Several worker processes run stochastic gradient descent on
+their own shard of the data and write their updates straight into one shared parameter buffer, without
+any locks. For sparse problems (matrix factorization, hashed features) updates rarely touch the same
+coordinates, so the occasional lost write doesn't hurt convergence while every core stays busy.
+
+Per-example gradient functions are called as gradient_fn(x, y, theta) with theta being the shared
+buffer itself. They can return a dense gradient list (e.g. gradients.linear_gradient) or, for
+sparse problems, a dict {coordinate: partial} so that only those coordinates are written.
+
+Reference: Chapter 8 : Gradient Descent
+"""
+
+import multiprocessing as mp
+import sys
+import time
+import traceback
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, NamedTuple, Sequence, Union
+
+from parallel_gradient import Row, share_dataset, shard_rows
+from random_streams import RandomStream
+from vector_operations import Vector
+
+Gradient = Union[Vector, Dict[int, float]]
+
+class HogwildResult(NamedTuple):
+    theta: Vector
+    num_examples: int
+    seconds: float
+    examples_per_second: float
+
+def _run_sgd(values: memoryview, num_rows: int, num_cols: int, is_scalar: bool,
+             start: int, end: int, gradient_fn: Callable[[Row, float, Sequence[float]], Gradient],
+             params, learning_rate: float, num_epochs: int,
+             rng: RandomStream, counts, worker: int) -> None:
+    shard = shard_rows(values, num_rows, num_cols, is_scalar, start, end)
+    for _ in range(num_epochs):
+        rng.shuffle(shard)
+        for x, y in shard:
+            gradient = gradient_fn(x, y, params)
+            # write without locking, other workers may be updating at the same time
+            if isinstance(gradient, dict):
+                for j, g in gradient.items():
+                    params[j] -= learning_rate * g
+            else:
+                for j, g in enumerate(gradient):
+                    if g:
+                        params[j] -= learning_rate * g
+        counts[worker] += len(shard)
+
+def _hogwild_worker(shm_name: str, num_rows: int, num_cols: int, is_scalar: bool,
+                    start: int, end: int, gradient_fn, params, learning_rate: float,
+                    num_epochs: int, rng: RandomStream, counts, worker: int) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = shm.buf.cast('d')
+    # the shard's views into the buffer are gone once _run_sgd returns,
+    # or once its exception (whose traceback holds them) has been handled
+    failed = False
+    try:
+        _run_sgd(values, num_rows, num_cols, is_scalar, start, end, gradient_fn,
+                 params, learning_rate, num_epochs, rng, counts, worker)
+    except Exception:
+        traceback.print_exc()
+        failed = True
+    values.release()
+    shm.close()
+    if failed:
+        sys.exit(1)
+
+def hogwild_sgd(xs: Sequence[Row], ys: Sequence[float],
+                gradient_fn: Callable[[Row, float, Sequence[float]], Gradient],
+                theta: Vector,
+                learning_rate: float = 0.001,
+                num_epochs: int = 10,
+                num_workers: int = 4,
+                seed: int = 0) -> HogwildResult:
+    """Runs num_epochs of lock-free SGD over the data on num_workers processes.
+    Raises RuntimeError if any worker fails."""
+    shm, num_rows, num_cols, is_scalar = share_dataset(xs, ys)
+    params = mp.RawArray('d', theta)      # shared and deliberately unsynchronized
+    counts = mp.RawArray('q', num_workers) # each worker only writes its own slot
+    streams = RandomStream(seed).spawn(num_workers)
+
+    bounds = [num_rows * w // num_workers for w in range(num_workers + 1)]
+    workers: List[mp.Process] = []
+    start_time = time.perf_counter()
+    try:
+        for w, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            worker = mp.Process(target=_hogwild_worker,
+                                args=(shm.name, num_rows, num_cols, is_scalar, start, end,
+                                      gradient_fn, params, learning_rate, num_epochs,
+                                      streams[w], counts, w))
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():     # we got here through an exception
+                worker.terminate()
+                worker.join()
+        shm.close()
+        shm.unlink()
+    seconds = time.perf_counter() - start_time
+
+    failed = [w for w, worker in enumerate(workers) if worker.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"hogwild workers {failed} failed, theta is incomplete")
+
+    num_examples = sum(counts)
+    return HogwildResult(list(params), num_examples, seconds, num_examples / seconds)
+
+def sparse_sqerror_gradient(x: Vector, y: float, beta: Sequence[float]) -> Dict[int, float]:
+    """Squared error gradient that only reports the non-zero features of x"""
+    nonzero = [(j, x_j) for j, x_j in enumerate(x) if x_j]
+    error = sum(x_j * beta[j] for j, x_j in nonzero) - y
+    return {j: 2 * error * x_j for j, x_j in nonzero}
+
+if __name__ == "__main__":
+    from gradients import linear_gradient
+
+    # the slope = 20, intercept = 5 problem from gradient_descent, with x scaled to [-1, 1)
+    xs = [x / 50 for x in range(-50, 50)] * 20
+    ys = [20*x + 5 for x in xs]
+    result = hogwild_sgd(xs, ys, linear_gradient, [0.0, 0.0],
+                         learning_rate=0.01, num_epochs=20, num_workers=2)
+    slope, intercept = result.theta
+    assert 19.9 < slope < 20.1 and 4.9 < intercept < 5.1
+    print(f"linear: {result.examples_per_second:,.0f} examples/sec")
+
+    # a sparse problem: 1000 features, 5 active per example
+    rng = RandomStream(0)
+    beta = [rng.uniform(-1, 1) for _ in range(1000)]
+    xs = []
+    for _ in range(20000):
+        x = [0.0] * 1000
+        for j in rng.sample(range(1000), 5):
+            x[j] = 1.0
+        xs.append(x)
+    ys = [sum(x_j * b_j for x_j, b_j in zip(x, beta)) for x in xs]
+    result = hogwild_sgd(xs, ys, sparse_sqerror_gradient, [0.0] * 1000,
+                         learning_rate=0.05, num_epochs=5, num_workers=mp.cpu_count())
+    max_error = max(abs(b - b_hat) for b, b_hat in zip(beta, result.theta))
+    print(f"sparse: max coefficient error {max_error:.4f}, "
+          f"{result.examples_per_second:,.0f} examples/sec")
+
+    # a worker that dies is reported instead of returning a half-trained theta
+    def failing_gradient(x: float, y: float, theta: Sequence[float]) -> Vector:
+        raise ValueError("bad gradient")
+
+    try:
+        hogwild_sgd([1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0], failing_gradient, [0.0, 0.0],
+                    num_workers=2)
+        assert False, "hogwild_sgd should have raised"
+    except RuntimeError:
+        pass
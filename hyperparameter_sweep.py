@@ -0,0 +1,114 @@
+"""
+Description: A hyperparameter sweep scheduler. Given a search space and a train/evaluate callable it runs
+trials concurrently on a process pool and cuts the bad ones early with successive halving: every trial
+first gets a small budget (e.g. a few epochs), only the best 1/eta of them move on to eta times the
+budget, and so on. Every evaluated trial is appended to a JSON-lines results file.
+
+The train/evaluate callable is called as trial_fn(params, budget) and returns a loss (lower is better).
+It must be defined at module level so it can be sent to the worker processes.
+
+Reference: Chapter 11 : Machine Learning
+"""
+
+import itertools
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+Params = Dict[str, Any]
+TrialFn = Callable[[Params, int], float]
+
+class TrialResult(NamedTuple):
+    trial_id: int
+    params: Params
+    budget: int
+    loss: float
+
+def grid(space: Dict[str, Sequence]) -> List[Params]:
+    """Every combination of the listed values"""
+    names = list(space)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(space[name] for name in names))]
+
+def random_configs(space: Dict[str, Any], num_trials: int,
+                   rng: random.Random = random) -> List[Params]:
+    """num_trials random configurations. Each entry of space is either a list of choices
+    or a function rng -> value, e.g. lambda rng: 10 ** rng.uniform(-4, -1)"""
+    return [{name: (sampler(rng) if callable(sampler) else rng.choice(sampler))
+             for name, sampler in space.items()}
+            for _ in range(num_trials)]
+
+def _run_trial(trial_fn: TrialFn, trial_id: int, params: Params, budget: int) -> TrialResult:
+    """A trial that overflows or divides by zero has diverged (e.g. a too large learning rate)
+    and gets an infinite loss; any other exception is a bug and propagates"""
+    try:
+        loss = float(trial_fn(params, budget))
+    except ArithmeticError:
+        loss = float('inf')
+    if loss != loss:                          # nan
+        loss = float('inf')
+    return TrialResult(trial_id, params, budget, loss)
+
+def successive_halving(trial_fn: TrialFn,
+                       configs: List[Params],
+                       min_budget: int = 1,
+                       max_budget: int = 27,
+                       eta: int = 3,
+                       num_workers: int = 4,
+                       results_path: Optional[str] = None) -> List[TrialResult]:
+    """Runs configs with growing budgets, keeping the best 1/eta after each round.
+    Once a single config is left it is trained at max_budget straight away.
+    Returns the results of the final round (at max_budget), best first."""
+    assert eta >= 2, "eta must be at least 2"
+    survivors = list(enumerate(configs))
+    budget = min_budget
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        while True:
+            if len(survivors) == 1:     # nothing left to compare, go straight to the full budget
+                budget = max_budget
+            futures = [executor.submit(_run_trial, trial_fn, trial_id, params, budget)
+                       for trial_id, params in survivors]
+            results = sorted((future.result() for future in futures), key=lambda r: r.loss)
+
+            if results_path:
+                with open(results_path, 'a') as f:
+                    for result in results:
+                        f.write(json.dumps(result._asdict()) + "\n")
+
+            if budget >= max_budget:
+                return results
+
+            num_keep = max(1, len(results) // eta)
+            survivors = [(r.trial_id, r.params) for r in results[:num_keep]]
+            budget = min(budget * eta, max_budget)
+
+def load_results(results_path: str) -> List[TrialResult]:
+    with open(results_path) as f:
+        return [TrialResult(**json.loads(line)) for line in f if line.strip()]
+
+# a toy problem: gradient descent on y = 20x + 5, the loss after `budget` epochs
+def linear_fit_loss(params: Params, budget: int) -> float:
+    input = [(x / 50, 20 * x / 50 + 5) for x in range(-50, 50)]
+    slope, intercept = 0.0, 0.0
+    for _ in range(budget):
+        grad_slope = sum(2 * (slope*x + intercept - y) * x for x, y in input) / len(input)
+        grad_intercept = sum(2 * (slope*x + intercept - y) for x, y in input) / len(input)
+        slope -= params['learning_rate'] * grad_slope
+        intercept -= params['learning_rate'] * grad_intercept
+    return sum((slope*x + intercept - y) ** 2 for x, y in input) / len(input)
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    results_path = os.path.join(tempfile.gettempdir(), "sweep_results.jsonl")
+    if os.path.exists(results_path):
+        os.remove(results_path)
+
+    configs = grid({'learning_rate': [0.0001, 0.001, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0]})
+    best = successive_halving(linear_fit_loss, configs, min_budget=3, max_budget=81,
+                              eta=3, num_workers=2, results_path=results_path)[0]
+    print(f"best: {best.params} loss {best.loss:.6f} after {best.budget} epochs")
+    print(f"{len(load_results(results_path))} trial evaluations written to {results_path}")
+    assert best.loss < 1e-6 and best.budget == 81
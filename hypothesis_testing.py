@@ -174,7 +174,11 @@ def B(alpha: float, beta: float) -> float:
     """A normalizing constant so that the total probability is 1"""
     return math.gamma(alpha) * math.gamma(beta) / math.gamma(alpha + beta)
 
+from beta_posterior import log_B
+
 def beta_pdf(x: float, alpha: float, beta: float) -> float:
     if x <= 0 or x >= 1:          # no weight outside of [0, 1]
         return 0
-    return x ** (alpha - 1) * (1 - x) ** (beta - 1) / B(alpha, beta)
+    # work in log-space so that large alpha and beta don't overflow
+    return math.exp((alpha - 1) * math.log(x) + (beta - 1) * math.log(1 - x)
+                    - log_B(alpha, beta))
@@ -40,7 +40,16 @@ class LabeledPoint(NamedTuple):
         
 def knn_classify(k: int,
                 labeled_points: List[Vector],
-                new_point: Vector) -> str:
+                new_point: Vector,
+                index = None) -> str:
+    """index is an optional nearest neighbor index built over labeled_points
+    (e.g. kd_tree.KDTree or metric_tree.VPTree), which answers the query without sorting every point.
+    If an approximate index finds no neighbors at all, every point is sorted after all."""
+    if index is not None:
+        k_nearest_labels = [lp.label for _, lp in index.nearest(new_point, k)]
+        if k_nearest_labels:
+            return majority_vote(k_nearest_labels)
+
     # Order the labeled points from nearest to farthest
     by_distance = sorted(labeled_points, 
                          key = lambda lp: distance(lp.point, new_point))
@@ -53,6 +62,55 @@ def knn_classify(k: int,
     # and let them vote
     return majority_vote(k_nearest_labels)
 
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from operator import sub
+from vector_operations import squared_distance
+
+# training data for the worker processes of knn_classify_many, set once per worker
+_knn_points: List[Vector] = []
+_knn_labels: List[str] = []
+
+def _set_knn_data(points: List[Vector], labels: List[str]) -> None:
+    global _knn_points, _knn_labels
+    _knn_points, _knn_labels = points, labels
+
+def _classify_block(k: int, queries: List[Vector]) -> List[str]:
+    points, labels = _knn_points, _knn_labels
+    predictions = []
+    for query in queries:
+        # squared distances order the points without a sqrt each (this is exactly the value of
+        # squared_distance, minus its per-pair length check), and nsmallest keeps only k
+        # candidates instead of sorting all n (ties still go to the earlier point)
+        distances = [sum([d * d for d in map(sub, point, query)]) for point in points]
+        nearest = heapq.nsmallest(k, range(len(points)), key=distances.__getitem__)
+        predictions.append(majority_vote([labels[i] for i in nearest]))
+    return predictions
+
+def knn_classify_many(k: int,
+                      labeled_points: List[LabeledPoint],
+                      queries: List[Vector],
+                      num_workers: int = 1,
+                      block_size: int = 256) -> List[str]:
+    """knn_classify(k, labeled_points, query) for every query, in O(n log k) per query.
+    Points are ranked by squared distance, so the neighbors can differ from knn_classify
+    where the sqrt there rounds two slightly different squared distances to the same value.
+    With num_workers > 1 blocks of block_size queries are classified in parallel,
+    and the labeled points are sent to each worker only once."""
+    points = [lp.point for lp in labeled_points]
+    dim = len(points[0])
+    assert all(len(v) == dim for v in points) and all(len(v) == dim for v in queries), \
+        "all points and queries should have the same length"
+    labels = [lp.label for lp in labeled_points]
+    blocks = [queries[i:i + block_size] for i in range(0, len(queries), block_size)]
+    if num_workers <= 1:
+        _set_knn_data(points, labels)
+        return [label for block in blocks for label in _classify_block(k, block)]
+    with ProcessPoolExecutor(num_workers, initializer=_set_knn_data,
+                             initargs=(points, labels)) as pool:
+        return [label for block_labels in pool.map(_classify_block, [k] * len(blocks), blocks)
+                for label in block_labels]
+
 # Example on the iris dataset
 import requests
 data = requests.get(
@@ -142,6 +200,26 @@ pct_correct = num_correct/ len(iris_test)
 
 print(pct_correct, confusion_matrix)
 
+# the same predictions from a KD-tree built once over the training points
+from kd_tree import KDTree
+iris_tree = KDTree(iris_train)
+assert all(knn_classify(k, iris_train, iris.point, index=iris_tree) ==
+           knn_classify(k, iris_train, iris.point) for iris in iris_test)
+
+# or from a vantage-point tree, which works with any metric
+from metric_tree import VPTree
+iris_vp_tree = VPTree(iris_train)
+assert all(knn_classify(k, iris_train, iris.point, index=iris_vp_tree) ==
+           knn_classify(k, iris_train, iris.point) for iris in iris_test)
+
+# or the whole test set at once, the same as a full sort by squared distance
+def knn_classify_sorted(k: int, labeled_points: List[LabeledPoint], new_point: Vector) -> str:
+    by_distance = sorted(labeled_points, key=lambda lp: squared_distance(lp.point, new_point))
+    return majority_vote([lp.label for lp in by_distance[:k]])
+
+assert (knn_classify_many(k, iris_train, [iris.point for iris in iris_test]) ==
+        [knn_classify_sorted(k, iris_train, iris.point) for iris in iris_test])
+
 # curse of dimensionality
 def random_point(dim: int) -> Vector:
     return [random.random() for _ in range(dim)]
@@ -165,3 +243,18 @@ min_avg_ratio = [min_dist / avg_dist
                 for min_dist, avg_dist in zip(min_distances, avg_distances)]
 plt.plot(dimensions, avg_distances)
 plt.plot(dimensions, min_avg_ratio)
+
+if __name__ == "__main__":
+    import time
+    train = [LabeledPoint(random_point(4), random.choice("abc")) for _ in range(5000)]
+    test = [random_point(4) for _ in range(500)]
+
+    start = time.perf_counter()
+    one_at_a_time = [knn_classify_sorted(5, train, point) for point in test]
+    print(f"sorting every point: {time.perf_counter() - start:.2f}s")
+
+    for num_workers in [1, 4]:
+        start = time.perf_counter()
+        batched = knn_classify_many(5, train, test, num_workers=num_workers)
+        print(f"knn_classify_many, {num_workers} workers: {time.perf_counter() - start:.2f}s")
+        assert batched == one_at_a_time
@@ -0,0 +1,160 @@
+"""
+Description: A KD-tree for exact nearest neighbor and radius queries. The tree is built once over
+labeled points (anything with a .point, e.g. k_nearest_neighbors.LabeledPoint); each node splits
+its points at the median of the coordinate with the largest spread. A query walks the side of
+each split that contains it first and skips the other side whenever the splitting plane is farther
+away than the k-th nearest point found so far. For low-dimensional data like the iris measurements
+that prunes most of the tree, so a query looks at far fewer than n points.
+
+Points are ranked by the same value as vector_operations.distance, and ties are broken by the
+original order like the stable sort in knn_classify, so knn_classify(k, points, x, index=KDTree(points))
+gives the same answers as the full sort.
+
+Reference: Chapter 12: k-Nearest Neighbors
+"""
+
+import heapq
+import math
+from operator import sub
+from typing import Any, List, NamedTuple, Sequence, Tuple, Union
+
+from vector_operations import Vector
+
+class _Leaf(NamedTuple):
+    start: int
+    end: int
+
+class _Split(NamedTuple):
+    dim: int
+    value: float
+    left: Any       # _Leaf or _Split with coordinates <= value
+    right: Any      # _Leaf or _Split with coordinates >= value
+
+Node = Union[_Leaf, _Split]
+
+# pruning compares rounded distances with rounded plane offsets,
+# so allow for a little rounding error before skipping a side
+_SLACK = 1 + 1e-9
+
+def _distance(v: Vector, w: Vector) -> float:
+    """Exactly the value of vector_operations.distance, without the length check and copies"""
+    return math.sqrt(sum([d * d for d in map(sub, v, w)]))
+
+class KDTree:
+    def __init__(self, labeled_points: Sequence[Any], leaf_size: int = 8) -> None:
+        self.items = list(labeled_points)
+        self.leaf_size = leaf_size
+        self._points = [item.point for item in self.items]
+        self._order = list(range(len(self.items)))   # leaves are ranges of this
+        self.num_distances = 0                        # distance computations, for benchmarking
+        self.root = self._build(0, len(self.items))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _build(self, start: int, end: int) -> Node:
+        if end - start <= self.leaf_size:
+            return _Leaf(start, end)
+        points, order = self._points, self._order
+        dims = range(len(points[order[start]]))
+        spreads = [max(points[i][d] for i in order[start:end]) -
+                   min(points[i][d] for i in order[start:end]) for d in dims]
+        dim = max(dims, key=lambda d: spreads[d])
+        if spreads[dim] == 0:          # all the same point
+            return _Leaf(start, end)
+
+        order[start:end] = sorted(order[start:end], key=lambda i: points[i][dim])
+        mid = (start + end) // 2
+        return _Split(dim, points[order[mid]][dim],
+                      self._build(start, mid), self._build(mid, end))
+
+    def nearest(self, query: Vector, k: int) -> List[Tuple[float, Any]]:
+        """The k nearest (distance, item) pairs, nearest first"""
+        points, order = self._points, self._order
+        # max-heap of the best k so far as (-distance, -index): the root is the worst,
+        # and among equal distances the later point is the worse one
+        heap: List[Tuple[float, int]] = []
+
+        def search(node: Node) -> None:
+            if isinstance(node, _Leaf):
+                self.num_distances += node.end - node.start
+                for i in order[node.start:node.end]:
+                    entry = (-_distance(points[i], query), -i)
+                    if len(heap) < k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                return
+            diff = query[node.dim] - node.value
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            search(near)
+            # the far side can't be closer than the splitting plane
+            if len(heap) < k or abs(diff) <= -heap[0][0] * _SLACK:
+                search(far)
+
+        if k > 0:
+            search(self.root)
+        return [(-d, self.items[-i]) for d, i in sorted(heap, reverse=True)]
+
+    def within(self, query: Vector, radius: float) -> List[Tuple[float, Any]]:
+        """Every (distance, item) with distance <= radius, nearest first"""
+        points, order = self._points, self._order
+        reach = radius * _SLACK
+        found: List[Tuple[float, int]] = []
+
+        def search(node: Node) -> None:
+            if isinstance(node, _Leaf):
+                self.num_distances += node.end - node.start
+                for i in order[node.start:node.end]:
+                    d = _distance(points[i], query)
+                    if d <= radius:
+                        found.append((d, i))
+                return
+            diff = query[node.dim] - node.value
+            if diff <= reach:        # the query ball reaches the left side
+                search(node.left)
+            if -diff <= reach:       # ... and/or the right side
+                search(node.right)
+
+        search(self.root)
+        return [(d, self.items[i]) for d, i in sorted(found)]
+
+import random
+from vector_operations import distance
+
+class _Point(NamedTuple):
+    point: Vector
+    label: str
+
+rng = random.Random(0)
+points = [_Point([rng.random() for _ in range(3)], rng.choice("ab")) for _ in range(2000)]
+tree = KDTree(points)
+
+for _ in range(20):
+    query = [rng.random() for _ in range(3)]
+    by_distance = sorted(points, key=lambda p: distance(p.point, query))
+    assert [p for _, p in tree.nearest(query, 5)] == by_distance[:5]
+    assert ([p for _, p in tree.within(query, 0.1)] ==
+            [p for p in by_distance if distance(p.point, query) <= 0.1])
+
+# values on a 0.1 grid, like the iris measurements, have lots of exactly tied distances
+grid_points = [_Point([rng.randrange(40, 80) / 10, rng.randrange(20, 45) / 10,
+                       rng.randrange(10, 70) / 10, rng.randrange(1, 25) / 10], str(i))
+               for i in range(105)]
+grid_tree = KDTree(grid_points)
+for _ in range(500):
+    query = [rng.randrange(40, 80) / 10, rng.randrange(20, 45) / 10,
+             rng.randrange(10, 70) / 10, rng.randrange(1, 25) / 10]
+    by_distance = sorted(grid_points, key=lambda p: distance(p.point, query))
+    assert [p for _, p in grid_tree.nearest(query, 5)] == by_distance[:5]
+
+# pruning means far fewer distance computations than a linear scan
+tree.num_distances = 0
+for _ in range(100):
+    tree.nearest([rng.random() for _ in range(3)], 5)
+assert tree.num_distances / 100 < len(points) / 10
+
+# duplicates and k larger than the data
+same = KDTree([_Point([1.0, 1.0], str(i)) for i in range(20)], leaf_size=2)
+assert [p.label for _, p in same.nearest([0.0, 0.0], 3)] == ["0", "1", "2"]
+assert len(same.nearest([0.0, 0.0], 50)) == 20
@@ -0,0 +1,113 @@
+"""
+Description: Fitting logistic regression with Newton's method (iteratively reweighted least squares).
+Each iteration makes one pass over the rows, which builds the gradient, the Hessian and the negative
+log-likelihood (in a numerically stable softplus form) from the same margins, and solves one d x d
+linear system. Margins are updated along the Newton step rather than recomputed from scratch. It usually
+converges in fewer than 10 iterations where logistic_regression runs 5000 epochs of gradient descent.
+
+Reference: Chapter 16 : Logistic Regression
+"""
+
+import math
+from typing import List, Tuple
+
+from matrix_operations import solve
+from vector_operations import Vector, dot
+
+def logistic(x: float) -> float:
+    """Like logistic_regression.logistic, but without overflow for very negative x"""
+    if x >= 0:
+        return 1.0 / (1 + math.exp(-x))
+    e = math.exp(x)
+    return e / (1 + e)
+
+def softplus(z: float) -> float:
+    """log(1 + exp(z)) without overflow"""
+    return max(z, 0.0) + math.log1p(math.exp(-abs(z)))
+
+def negative_log_likelihood(xs: List[Vector], ys: List[float], beta: Vector) -> float:
+    """Same value as logistic_regression.negative_log_likelihood, but it neither
+    overflows nor takes log(0) when predictions are (almost) exactly 0 or 1"""
+    total = 0.0
+    for x, y in zip(xs, ys):
+        z = dot(x, beta)
+        # -log(logistic(z)) = softplus(-z) and -log(1 - logistic(z)) = softplus(z)
+        total += softplus(z) - y * z
+    return total
+
+def negative_log_gradient(xs: List[Vector], ys: List[float], beta: Vector) -> Vector:
+    """Same as logistic_regression.negative_log_gradient, one margin per row"""
+    gradient = [0.0] * len(beta)
+    for x, y in zip(xs, ys):
+        error = logistic(dot(x, beta)) - y
+        for j, x_j in enumerate(x):
+            gradient[j] += error * x_j
+    return gradient
+
+def newton_fit(xs: List[Vector], ys: List[float],
+               l2: float = 0.0,
+               tol: float = 1e-8,
+               max_iterations: int = 50) -> Tuple[Vector, int]:
+    """Minimizes negative_log_likelihood (+ l2/2 * |beta[1:]|^2) with Newton steps.
+    A small l2 keeps the problem well defined when the classes are separable.
+    Returns beta and the number of iterations."""
+    d = len(xs[0])
+    beta = [0.0] * d
+    margins = [0.0] * len(xs)    # dot(x, beta) for every row, kept up to date
+    for iteration in range(1, max_iterations + 1):
+        gradient = [0.0] * d
+        hessian = [[0.0] * d for _ in range(d)]
+        loss = l2 / 2 * dot(beta[1:], beta[1:])
+        for x, y, z in zip(xs, ys, margins):
+            p = logistic(z)
+            loss += softplus(z) - y * z
+            weight = p * (1 - p)
+            error = p - y
+            for i, x_i in enumerate(x):
+                gradient[i] += error * x_i
+                if x_i:
+                    wx_i = weight * x_i
+                    row = hessian[i]
+                    for j in range(i, d):
+                        row[j] += wx_i * x[j]
+        for i in range(d):
+            for j in range(i):
+                hessian[i][j] = hessian[j][i]
+            if i > 0:   # the intercept isn't penalized
+                gradient[i] += l2 * beta[i]
+                hessian[i][i] += l2
+
+        step = solve(hessian, gradient)
+        # the margins of beta - scale * step are margins - scale * dot(x, step),
+        # so trying a step length costs O(n) rather than n more dot products
+        step_margins = [dot(x, step) for x in xs]
+        # halve the step until the loss actually goes down
+        scale = 1.0
+        while True:
+            candidate = [b - scale * s for b, s in zip(beta, step)]
+            candidate_margins = [z - scale * s for z, s in zip(margins, step_margins)]
+            new_loss = (sum(softplus(z) - y * z for z, y in zip(candidate_margins, ys))
+                        + l2 / 2 * dot(candidate[1:], candidate[1:]))
+            if new_loss <= loss or scale < 1e-10:
+                break
+            scale /= 2
+        beta, margins = candidate, candidate_margins
+        if max(abs(scale * s) for s in step) < tol:
+            return beta, iteration
+    return beta, max_iterations
+
+if __name__ == "__main__":
+    import random
+    rng = random.Random(0)
+    true_beta = [-1.0, 2.0, -3.0]
+    xs = [[1.0, rng.gauss(0, 1), rng.gauss(0, 1)] for _ in range(1000)]
+    ys = [1.0 if rng.random() < logistic(dot(x, true_beta)) else 0.0 for x in xs]
+
+    beta, num_iterations = newton_fit(xs, ys)
+    print(f"newton_fit converged in {num_iterations} iterations: {beta}")
+    assert num_iterations <= 10
+    assert all(abs(g) < 1e-6 for g in negative_log_gradient(xs, ys, beta))
+    assert all(abs(b - t) < 0.5 for b, t in zip(beta, true_beta))
+
+    # the stable loss doesn't blow up for confident predictions
+    assert negative_log_likelihood([[1.0, 1000.0]], [0.0], [0.0, 1.0]) == 1000.0
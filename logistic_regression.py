@@ -73,7 +73,10 @@ def _negative_log_gradient(x: Vector,
                          y: float,
                          beta: Vector) -> Vector:
     """The gradient for one data point"""
-    return [_negative_log_partial(x,y,beta,j) for j in range(len(beta))]
+    # Every partial needs the same prediction, so compute it only once
+    # instead of calling _negative_log_partial for each j
+    error = y - logistic(dot(x,beta))
+    return [-error*x_j for x_j in x]
 
 def negative_log_gradient(xs: List[Vector],
                            ys: List[float],
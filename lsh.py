@@ -0,0 +1,167 @@
+"""
+Description: Approximate nearest neighbors with random-hyperplane locality sensitive hashing. Each of
+num_tables hash tables assigns a point a num_bits signature, one bit per random hyperplane telling which
+side of it the point is on; points at a small angle from each other usually share signatures. A query
+collects the points in its own bucket (and, with num_probes > 0, in the buckets one bit flip away
+across the hyperplanes it is closest to) from every table, then ranks only those candidates exactly.
+
+More tables and probes raise recall, more bits per table make buckets smaller and queries faster.
+Meant for high-dimensional vectors such as word embeddings or user vectors, where tree indexes end up
+looking at nearly every point. Has the same nearest(query, k) method as kd_tree.KDTree, so it can be
+the index of k_nearest_neighbors.knn_classify.
+
+Reference: Chapter 12: k-Nearest Neighbors
+"""
+
+import math
+import random
+from collections import defaultdict
+from operator import mul
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Set, Tuple
+
+from vector_operations import Vector
+
+Metric = Callable[[Vector, Vector], float]
+
+class HyperplaneLSH:
+    def __init__(self, labeled_points: Sequence[Any],
+                 num_tables: int = 8,
+                 num_bits: int = 12,
+                 metric: Metric = math.dist,
+                 rng: random.Random = random) -> None:
+        """labeled_points are anything with a .point. metric is used to rank the candidates.
+        The hyperplanes go through the mean of the points, so data that isn't centered
+        at the origin is hashed as well as data that is."""
+        self.items = list(labeled_points)
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.metric = metric
+        self.num_candidates = 0      # candidates ranked, for benchmarking
+
+        dim = len(self.items[0].point)
+        n = len(self.items)
+        self.center = [sum(item.point[j] for item in self.items) / n for j in range(dim)]
+        self.hyperplanes = [[[rng.gauss(0, 1) for _ in range(dim)] for _ in range(num_bits)]
+                            for _ in range(num_tables)]
+        self.tables: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(num_tables)]
+        for i, item in enumerate(self.items):
+            for table, planes in zip(self.tables, self.hyperplanes):
+                table[self._signature(self._projections(item.point, planes))].append(i)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _projections(self, point: Vector, planes: List[Vector]) -> List[float]:
+        centered = [x - c for x, c in zip(point, self.center)]
+        return [sum(map(mul, plane, centered)) for plane in planes]
+
+    @staticmethod
+    def _signature(projections: List[float]) -> int:
+        signature = 0
+        for bit, projection in enumerate(projections):
+            if projection > 0:
+                signature |= 1 << bit
+        return signature
+
+    def candidates(self, query: Vector, num_probes: int = 0) -> Set[int]:
+        """Indices of every point sharing a probed bucket with query"""
+        found: Set[int] = set()
+        for table, planes in zip(self.tables, self.hyperplanes):
+            projections = self._projections(query, planes)
+            signature = self._signature(projections)
+            found.update(table.get(signature, ()))
+            # the next most likely buckets are across the nearest hyperplanes
+            closest_bits = sorted(range(self.num_bits), key=lambda bit: abs(projections[bit]))
+            for bit in closest_bits[:num_probes]:
+                found.update(table.get(signature ^ (1 << bit), ()))
+        return found
+
+    def nearest(self, query: Vector, k: int, num_probes: int = 0) -> List[Tuple[float, Any]]:
+        """Approximately the k nearest (distance, item) pairs, nearest first.
+        When the probed buckets hold fewer than k points, more buckets are probed,
+        and if even every one-bit flip isn't enough all the points are ranked,
+        so the result always has min(k, len(self)) pairs."""
+        wanted = min(k, len(self.items))
+        candidates = self.candidates(query, num_probes)
+        while len(candidates) < wanted and num_probes < self.num_bits:
+            num_probes += 1
+            candidates = self.candidates(query, num_probes)
+        if len(candidates) < wanted:
+            candidates = set(range(len(self.items)))
+        self.num_candidates += len(candidates)
+        ranked = sorted((self.metric(self.items[i].point, query), i) for i in candidates)
+        return [(d, self.items[i]) for d, i in ranked[:k]]
+
+    def nearest_many(self, queries: Sequence[Vector], k: int,
+                     num_probes: int = 0) -> List[List[Tuple[float, Any]]]:
+        return [self.nearest(query, k, num_probes) for query in queries]
+
+def recall_at_k(approximate: List[Any], exact: List[Any]) -> float:
+    """Fraction of the true k nearest neighbors that the approximate search found"""
+    exact_ids = {id(item) for item in exact}
+    return sum(1 for item in approximate if id(item) in exact_ids) / len(exact)
+
+class _Point(NamedTuple):
+    point: Vector
+    label: int
+
+def _cluster_centers(num_clusters: int, dim: int, rng: random.Random) -> List[Vector]:
+    return [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(num_clusters)]
+
+def _clustered_points(num_points: int, centers: List[Vector],
+                      rng: random.Random) -> List[_Point]:
+    points = []
+    for _ in range(num_points):
+        label = rng.randrange(len(centers))
+        points.append(_Point([c + rng.gauss(0, 0.3) for c in centers[label]], label))
+    return points
+
+rng = random.Random(0)
+centers = _cluster_centers(20, 32, rng)
+points = _clustered_points(2000, centers, rng)
+# held-out queries: the same clusters, but not copies of indexed points
+queries = [p.point for p in _clustered_points(20, centers, rng)]
+index = HyperplaneLSH(points, num_tables=10, num_bits=10, rng=rng)
+
+exact = [[p for p in sorted(points, key=lambda p: math.dist(p.point, q))[:10]] for q in queries]
+recalls = [recall_at_k([p for _, p in found], true_neighbors)
+           for found, true_neighbors in zip(index.nearest_many(queries, 10, num_probes=2), exact)]
+assert sum(recalls) / len(recalls) > 0.9
+assert index.num_candidates / len(queries) < len(points) / 2
+
+# more probes can only add candidates
+assert index.candidates(queries[0]) <= index.candidates(queries[0], num_probes=3)
+assert all(query != p.point for query in queries for p in points)
+
+# a tiny index has mostly empty buckets, but still returns k neighbors
+few = [_Point([1.0, 0.0], 0), _Point([0.0, 1.0], 1), _Point([-1.0, -1.0], 2)]
+tiny = HyperplaneLSH(few, num_tables=1, num_bits=8, rng=rng)
+for query in [[1.0, 0.1], [-0.5, 2.0], [3.0, -3.0]]:
+    assert len(tiny.nearest(query, 2)) == 2
+    assert [p for _, p in tiny.nearest(query, 3)] == sorted(few, key=lambda p: math.dist(p.point, query))
+
+if __name__ == "__main__":
+    import time
+
+    rng = random.Random(1)
+    centers = _cluster_centers(100, 64, rng)
+    points = _clustered_points(20000, centers, rng)
+    queries = [p.point for p in _clustered_points(100, centers, rng)]
+    k = 10
+
+    # the ranking knn_classify uses: every point sorted by distance
+    start = time.perf_counter()
+    exact = [sorted(points, key=lambda p: math.dist(p.point, q))[:k] for q in queries]
+    brute_force_time = (time.perf_counter() - start) / len(queries)
+    print(f"brute force: {1000 * brute_force_time:.1f} ms/query")
+
+    for num_tables, num_bits, num_probes in [(4, 14, 0), (8, 14, 0), (8, 12, 2), (16, 12, 4)]:
+        index = HyperplaneLSH(points, num_tables, num_bits, rng=rng)
+        start = time.perf_counter()
+        results = index.nearest_many(queries, k, num_probes)
+        query_time = (time.perf_counter() - start) / len(queries)
+        recall = sum(recall_at_k([p for _, p in found], true_neighbors)
+                     for found, true_neighbors in zip(results, exact)) / len(queries)
+        print(f"tables={num_tables:2d} bits={num_bits} probes={num_probes}: "
+              f"recall@{k} = {recall:.3f}, {1000 * query_time:.1f} ms/query, "
+              f"{index.num_candidates / len(queries):.0f} candidates/query")
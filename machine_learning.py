@@ -6,13 +6,14 @@ Reference: Chapter 11 : Machine Learning
 """
 
 import random
-from typing import List, TypeVar, Tuple
+from typing import List, NamedTuple, TypeVar, Tuple
 X = TypeVar('X') # generic type to represent a data point
 
-def split_data(data: List[X], prob: float) -> Tuple[List[X], List[X]]:
+def split_data(data: List[X], prob: float,
+               rng: random.Random = random) -> Tuple[List[X], List[X]]:
     """Split data into fractions [prob, 1-prob]"""
     data = data[:] # make a shallow copy of the data
-    random.shuffle(data)
+    rng.shuffle(data)
     cut = int(len(data)*prob)
     return data[:cut], data[cut:]
 
@@ -24,10 +25,11 @@ print(len(test))
 
 Y = TypeVar('Y') # generic type to represent output variable
 
-def train_test_split(xs: List[X], ys: List[Y], test_pct: float) -> Tuple[List[X], List[X], List[Y], List[Y]]:
+def train_test_split(xs: List[X], ys: List[Y], test_pct: float,
+                     rng: random.Random = random) -> Tuple[List[X], List[X], List[Y], List[Y]]:
         # Generate indices and split them
     idxs = [i for i in range(len(xs))]
-    train_idxs, test_idxs = split_data(idxs, 1-test_pct)
+    train_idxs, test_idxs = split_data(idxs, 1-test_pct, rng)
         
     return ([xs[i] for i in train_idxs], # x_train
                 [xs[i] for i in test_idxs], # x_test
@@ -44,6 +46,95 @@ print("Number of points in training output =", len(y_train))
 print("Number of points in testing input =",len(x_test))
 print("Number of points in testing output =", len(y_test))
 
+## Splits that don't copy the data
+# Each function below keeps one 8-byte index per row (or nothing at all for
+# streams) and hands back views into the original data.
+from array import array
+from typing import Callable, Hashable, Iterable, Iterator, Sequence
+import hashlib
+from collections import defaultdict
+from data_loader import BatchView
+
+def split_indices(n: int, prob: float,
+                  rng: random.Random = random) -> Tuple[Sequence[int], Sequence[int]]:
+    """Shuffled row indices split into fractions [prob, 1-prob].
+    Both parts share a single index array."""
+    idxs = array('q', range(n))
+    rng.shuffle(idxs)
+    cut = int(n*prob)
+    return memoryview(idxs)[:cut], memoryview(idxs)[cut:]
+
+def split_data_view(data: Sequence[X], prob: float,
+                    rng: random.Random = random) -> Tuple[Sequence[X], Sequence[X]]:
+    """Like split_data, but returns views into data instead of copies"""
+    train_idxs, test_idxs = split_indices(len(data), prob, rng)
+    return (BatchView(data, train_idxs, 0, len(train_idxs)),
+            BatchView(data, test_idxs, 0, len(test_idxs)))
+
+def train_test_split_view(xs: Sequence[X], ys: Sequence[Y], test_pct: float,
+                          rng: random.Random = random
+                          ) -> Tuple[Sequence[X], Sequence[X], Sequence[Y], Sequence[Y]]:
+    """Like train_test_split, but the four parts are views sharing one index array"""
+    assert len(xs) == len(ys), "xs and ys must have the same length"
+    train_idxs, test_idxs = split_indices(len(xs), 1-test_pct, rng)
+    return (BatchView(xs, train_idxs, 0, len(train_idxs)), # x_train
+            BatchView(xs, test_idxs, 0, len(test_idxs)),   # x_test
+            BatchView(ys, train_idxs, 0, len(train_idxs)), # y_train
+            BatchView(ys, test_idxs, 0, len(test_idxs)))   # y_test
+
+def hash_split(key: Hashable, test_pct: float, salt: str = "") -> bool:
+    """Deterministically decides whether the row with this key goes to the test set.
+    The same key always lands on the same side, across runs and machines."""
+    digest = hashlib.md5(f"{salt}{key}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') < test_pct * 2**64
+
+def hash_split_stream(rows: Iterable[X], test_pct: float,
+                      key: Callable[[X], Hashable] = repr,
+                      salt: str = "") -> Iterator[Tuple[bool, X]]:
+    """Tags every row of a (possibly huge) stream with is_test, using no memory per row"""
+    for row in rows:
+        yield hash_split(key(row), test_pct, salt), row
+
+def stratified_split_indices(labels: Sequence[Y], test_pct: float,
+                             rng: random.Random = random) -> Tuple[Sequence[int], Sequence[int]]:
+    """Train and test indices with (as close as possible) the same label proportions"""
+    idxs_by_label = defaultdict(lambda: array('q'))
+    for i, label in enumerate(labels):
+        idxs_by_label[label].append(i)
+
+    train_idxs, test_idxs = array('q'), array('q')
+    for label_idxs in idxs_by_label.values():
+        rng.shuffle(label_idxs)
+        cut = round(len(label_idxs)*test_pct)
+        test_idxs.extend(label_idxs[:cut])
+        train_idxs.extend(label_idxs[cut:])
+    # mix the labels back together
+    rng.shuffle(train_idxs)
+    rng.shuffle(test_idxs)
+    return train_idxs, test_idxs
+
+def stratified_train_test_split(xs: Sequence[X], ys: Sequence[Y], test_pct: float,
+                                rng: random.Random = random
+                                ) -> Tuple[Sequence[X], Sequence[X], Sequence[Y], Sequence[Y]]:
+    """train_test_split_view that keeps the label proportions of ys in both parts"""
+    train_idxs, test_idxs = stratified_split_indices(ys, test_pct, rng)
+    return (BatchView(xs, train_idxs, 0, len(train_idxs)),
+            BatchView(xs, test_idxs, 0, len(test_idxs)),
+            BatchView(ys, train_idxs, 0, len(train_idxs)),
+            BatchView(ys, test_idxs, 0, len(test_idxs)))
+
+x_train, x_test, y_train, y_test = train_test_split_view(xs, ys, 0.25)
+assert len(x_train) == 750 and len(x_test) == 250
+assert all(y == 2*x for x, y in zip(x_train, y_train))
+
+labels = ['spam'] * 100 + ['ham'] * 900
+_, _, y_train, y_test = stratified_train_test_split(list(range(1000)), labels, 0.2)
+assert y_test.count('spam') == 20 and y_train.count('spam') == 80
+
+num_test = sum(is_test for is_test, _ in hash_split_stream(range(10000), 0.2))
+assert 1900 < num_test < 2100
+assert hash_split("user-42", 0.2) == hash_split("user-42", 0.2)
+
 ## Some metrics to assess the model accuracy
 def accuracy(tp: int, fp: int, tn: int, fn: int) -> float:
     return (tp + tn)/ (tp + tn + fp + fn)
@@ -56,3 +147,216 @@ def recall(tp: int, fn: int) -> float:
 
 def f1_score(p: float, r: float) -> float:
     return 2 * p * r / (p + r)
+
+## k-fold cross-validation
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+def kfold_indices(n: int, k: int,
+                  rng: random.Random = random) -> List[Tuple[Sequence[int], Sequence[int]]]:
+    """(train, test) index arrays for each of k folds. The test folds are
+    views into one shuffled index array, the data itself is never copied."""
+    assert 2 <= k <= n, "need at least 2 folds and at least one row per fold"
+    idxs = array('q', range(n))
+    rng.shuffle(idxs)
+    bounds = [n*f//k for f in range(k+1)]
+    folds = []
+    for start, end in zip(bounds, bounds[1:]):
+        train_idxs = idxs[:start]
+        train_idxs.extend(idxs[end:])
+        folds.append((train_idxs, memoryview(idxs)[start:end]))
+    return folds
+
+def repeated_kfold_indices(n: int, k: int, num_repeats: int,
+                           rng: random.Random = random) -> List[Tuple[Sequence[int], Sequence[int]]]:
+    """k folds for each of num_repeats different shuffles"""
+    return [fold for _ in range(num_repeats) for fold in kfold_indices(n, k, rng)]
+
+_cv_data: Tuple[Sequence, Sequence] = ([], [])
+
+def _set_cv_data(xs: Sequence, ys: Sequence) -> None:
+    """Runs once per worker process, so the data is sent once per worker, not per fold"""
+    global _cv_data
+    _cv_data = (xs, ys)
+
+def _evaluate_fold(train_fn: Callable[[Sequence, Sequence], Any],
+                   predict_fn: Callable[[Any, Any], Any],
+                   train_idxs: Sequence[int],
+                   test_idxs: Sequence[int],
+                   positive_label: Any) -> Dict[str, float]:
+    xs, ys = _cv_data
+    model = train_fn(BatchView(xs, train_idxs, 0, len(train_idxs)),
+                     BatchView(ys, train_idxs, 0, len(train_idxs)))
+    tp = fp = tn = fn = 0
+    for i in test_idxs:
+        predicted_positive = predict_fn(model, xs[i]) == positive_label
+        actual_positive = ys[i] == positive_label
+        if predicted_positive and actual_positive: tp += 1
+        elif predicted_positive: fp += 1
+        elif actual_positive: fn += 1
+        else: tn += 1
+    # undefined ratios (e.g. no positive predictions) count as 0
+    p = precision(tp, fp) if tp + fp else 0.0
+    r = recall(tp, fn) if tp + fn else 0.0
+    return {'accuracy': accuracy(tp, fp, tn, fn),
+            'precision': p,
+            'recall': r,
+            'f1_score': f1_score(p, r) if p + r else 0.0}
+
+def cross_validate(train_fn: Callable[[Sequence, Sequence], Any],
+                   predict_fn: Callable[[Any, Any], Any],
+                   xs: Sequence[X], ys: Sequence[Y],
+                   k: int = 5,
+                   num_repeats: int = 1,
+                   positive_label: Any = True,
+                   num_workers: int = 1,
+                   rng: random.Random = random) -> Dict[str, Tuple[float, float]]:
+    """Trains train_fn(x_train, y_train) on every fold and scores predict_fn(model, x)
+    on the held-out rows. Returns (mean, standard deviation) of each metric across folds.
+    With num_workers > 1 the folds are trained concurrently on a process pool
+    (train_fn and predict_fn then need to be defined at module level)."""
+    folds = repeated_kfold_indices(len(xs), k, num_repeats, rng)
+    if num_workers == 1:
+        _set_cv_data(xs, ys)
+        scores = [_evaluate_fold(train_fn, predict_fn, train, test, positive_label)
+                  for train, test in folds]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_set_cv_data,
+                                 initargs=(xs, ys)) as executor:
+            # memoryviews can't be pickled, so the test folds go over as small arrays
+            futures = [executor.submit(_evaluate_fold, train_fn, predict_fn,
+                                       train, array('q', test), positive_label)
+                       for train, test in folds]
+            scores = [future.result() for future in futures]
+
+    summary = {}
+    for metric in scores[0]:
+        values = [score[metric] for score in scores]
+        mean = sum(values)/len(values)
+        variance = sum((v - mean)**2 for v in values)/(len(values) - 1) if len(values) > 1 else 0.0
+        summary[metric] = (mean, math.sqrt(variance))
+    return summary
+
+def _train_threshold(xs: Sequence[int], ys: Sequence[bool]) -> int:
+    """A toy model: predicts True at and above the smallest x labeled True"""
+    return min(x for x, y in zip(xs, ys) if y)
+
+def _predict_threshold(threshold: int, x: int) -> bool:
+    return x >= threshold
+
+xs = list(range(1000))
+ys = [x >= 700 for x in xs]
+cv_scores = cross_validate(_train_threshold, _predict_threshold, xs, ys, k=5, num_repeats=2)
+print(cv_scores)
+assert cv_scores['accuracy'][0] > 0.99
+
+## Metrics at every threshold at once
+class ThresholdCounts(NamedTuple):
+    threshold: float # predict positive when score >= threshold
+    tp: int
+    fp: int
+    tn: int
+    fn: int
+
+def threshold_sweep(scores: Sequence[float], labels: Sequence[bool]) -> List[ThresholdCounts]:
+    """Confusion counts for every distinct score used as the threshold,
+    from the highest threshold to the lowest, with a single sort"""
+    assert len(scores) == len(labels), "need one label per score"
+    num_positive = sum(1 for label in labels if label)
+    num_negative = len(labels) - num_positive
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+    sweep = []
+    tp = fp = 0
+    for rank, i in enumerate(order):
+        if labels[i]: tp += 1
+        else: fp += 1
+        # tied scores are all on the same side of any threshold
+        if rank + 1 == len(order) or scores[order[rank + 1]] != scores[i]:
+            sweep.append(ThresholdCounts(scores[i], tp, fp,
+                                         num_negative - fp, num_positive - tp))
+    return sweep
+
+def roc_curve(scores: Sequence[float], labels: Sequence[bool]) -> List[Tuple[float, float]]:
+    """(false positive rate, true positive rate) points, starting at (0, 0)"""
+    points = [(0.0, 0.0)]
+    for c in threshold_sweep(scores, labels):
+        points.append((c.fp / (c.fp + c.tn) if c.fp + c.tn else 0.0,
+                       recall(c.tp, c.fn) if c.tp + c.fn else 0.0))
+    return points
+
+def pr_curve(scores: Sequence[float], labels: Sequence[bool]) -> List[Tuple[float, float]]:
+    """(recall, precision) points from the highest threshold to the lowest"""
+    return [(recall(c.tp, c.fn) if c.tp + c.fn else 0.0, precision(c.tp, c.fp))
+            for c in threshold_sweep(scores, labels)]
+
+def auc(points: List[Tuple[float, float]]) -> float:
+    """Area under a curve given as (x, y) points sorted by x, using trapezoids"""
+    return sum((x1 - x0) * (y0 + y1) / 2
+               for (x0, y0), (x1, y1) in zip(points, points[1:]))
+
+def best_f1_threshold(scores: Sequence[float], labels: Sequence[bool]) -> Tuple[float, float]:
+    """The threshold with the highest F1 score, and that score"""
+    best_threshold, best_f1 = math.inf, 0.0
+    for c in threshold_sweep(scores, labels):
+        if c.tp == 0:
+            continue
+        f1 = f1_score(precision(c.tp, c.fp), recall(c.tp, c.fn))
+        if f1 > best_f1:
+            best_threshold, best_f1 = c.threshold, f1
+    return best_threshold, best_f1
+
+class ConfusionMatrix:
+    """Streaming confusion counts at a fixed threshold. Accumulators built on
+    different partitions of the data can be merged with +."""
+    def __init__(self, threshold: float = 0.5) -> None:
+        self.threshold = threshold
+        self.tp = self.fp = self.tn = self.fn = 0
+
+    def update(self, score: float, label: bool) -> None:
+        predicted = score >= self.threshold
+        if predicted and label: self.tp += 1
+        elif predicted: self.fp += 1
+        elif label: self.fn += 1
+        else: self.tn += 1
+
+    def update_many(self, scores: Iterable[float], labels: Iterable[bool]) -> None:
+        for score, label in zip(scores, labels):
+            self.update(score, label)
+
+    def __add__(self, other: 'ConfusionMatrix') -> 'ConfusionMatrix':
+        assert self.threshold == other.threshold, "can only merge counts at the same threshold"
+        merged = ConfusionMatrix(self.threshold)
+        merged.tp, merged.fp = self.tp + other.tp, self.fp + other.fp
+        merged.tn, merged.fn = self.tn + other.tn, self.fn + other.fn
+        return merged
+
+    def accuracy(self) -> float:
+        return accuracy(self.tp, self.fp, self.tn, self.fn)
+
+    def precision(self) -> float:
+        return precision(self.tp, self.fp) if self.tp + self.fp else 0.0
+
+    def recall(self) -> float:
+        return recall(self.tp, self.fn) if self.tp + self.fn else 0.0
+
+    def f1_score(self) -> float:
+        p, r = self.precision(), self.recall()
+        return f1_score(p, r) if p + r else 0.0
+
+scores = [0.9, 0.8, 0.7, 0.6, 0.55, 0.54, 0.53, 0.52, 0.51, 0.505]
+labels = [True, True, False, True, True, True, False, False, True, False]
+assert auc(roc_curve(scores, labels)) == 0.75
+best_threshold, best_f1 = best_f1_threshold(scores, labels)
+assert best_threshold == 0.54 and abs(best_f1 - 5/6) < 1e-12
+
+# perfectly separated scores
+assert auc(roc_curve([0.1, 0.2, 0.8, 0.9], [False, False, True, True])) == 1.0
+
+first_half, second_half = ConfusionMatrix(0.55), ConfusionMatrix(0.55)
+first_half.update_many(scores[:5], labels[:5])
+second_half.update_many(scores[5:], labels[5:])
+merged = first_half + second_half
+assert (merged.tp, merged.fp, merged.tn, merged.fn) == (4, 1, 3, 2)
@@ -31,3 +31,72 @@ def identity_matrix(n: int) -> Matrix:
     return make_matrix(n,n,lambda i,j:1 if i == j else 0)
 
 print(identity_matrix(5))
+
+def transpose(A: Matrix) -> Matrix:
+    """Swaps the rows and columns of A"""
+    num_rows, num_cols = shape(A)
+    return make_matrix(num_cols, num_rows, lambda i, j: A[j][i])
+
+def solve(A: Matrix, b: List[float]) -> List[float]:
+    """Solves A x = b for a square, non-singular A
+    using Gaussian elimination with partial pivoting"""
+    n = len(A)
+    assert shape(A) == (n, n) and len(b) == n, "A must be square and match b"
+
+    # work on an augmented copy [A | b]
+    M = [list(row) + [b_i] for row, b_i in zip(A, b)]
+    for col in range(n):
+        # swap in the row with the largest pivot for numerical stability
+        pivot = max(range(col, n), key=lambda r: abs(M[r][col]))
+        if M[pivot][col] == 0:
+            raise ValueError("matrix is singular")
+        M[col], M[pivot] = M[pivot], M[col]
+        for r in range(col + 1, n):
+            factor = M[r][col] / M[col][col]
+            if factor:
+                for c in range(col, n + 1):
+                    M[r][c] -= factor * M[col][c]
+
+    # back substitution
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        x[i] = (M[i][n] - sum(M[i][j] * x[j] for j in range(i + 1, n))) / M[i][i]
+    return x
+
+print(solve([[2, 1], [1, 3]], [3, 5]))
+
+import math
+
+def symmetric_eigen(A: Matrix,
+                    tol: float = 1e-12,
+                    max_sweeps: int = 100) -> Tuple[List[float], Matrix]:
+    """Eigenvalues and eigenvectors of a symmetric matrix (Jacobi rotations).
+    Returns (eigenvalues, Q) where column k of Q is the k-th eigenvector."""
+    n = len(A)
+    A = [list(row) for row in A]
+    Q = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    for _ in range(max_sweeps):
+        off_diagonal = sum(A[i][j] ** 2 for i in range(n) for j in range(i + 1, n))
+        if off_diagonal < tol * tol:
+            break
+        for p in range(n):
+            for q in range(p + 1, n):
+                if abs(A[p][q]) < 1e-300:
+                    continue
+                # rotation angle that zeroes A[p][q]
+                theta = (A[q][q] - A[p][p]) / (2 * A[p][q])
+                t = math.copysign(1.0, theta) / (abs(theta) + math.sqrt(theta * theta + 1))
+                c = 1 / math.sqrt(t * t + 1)
+                s = t * c
+                for k in range(n):   # A <- A J
+                    a_kp, a_kq = A[k][p], A[k][q]
+                    A[k][p], A[k][q] = c * a_kp - s * a_kq, s * a_kp + c * a_kq
+                for k in range(n):   # A <- J' A
+                    a_pk, a_qk = A[p][k], A[q][k]
+                    A[p][k], A[q][k] = c * a_pk - s * a_qk, s * a_pk + c * a_qk
+                for k in range(n):   # Q <- Q J
+                    q_kp, q_kq = Q[k][p], Q[k][q]
+                    Q[k][p], Q[k][q] = c * q_kp - s * q_kq, s * q_kp + c * q_kq
+    return [A[i][i] for i in range(n)], Q
+
+print(symmetric_eigen([[2, 1], [1, 2]])[0])
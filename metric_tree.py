@@ -0,0 +1,172 @@
+"""
+Description: A vantage-point tree for exact nearest neighbor search under any metric. Each node picks a
+vantage point and splits the remaining points into those inside and outside the median distance to it.
+Only the triangle inequality is used to prune, never coordinates, so it works for distances a KD-tree
+can't handle (angles between vectors, Hamming distance on categorical features) and degrades more
+gracefully in high dimensions. Queries keep the k best candidates in a bounded heap, and a built tree
+can be saved to disk and loaded back.
+
+Has the same nearest(query, k) method as kd_tree.KDTree, so it can be passed as the index of
+k_nearest_neighbors.knn_classify.
+
+Reference: Chapter 12: k-Nearest Neighbors
+"""
+
+import heapq
+import math
+import pickle
+import random
+from operator import sub
+from typing import Any, Callable, List, NamedTuple, Sequence, Tuple, Union
+
+from vector_operations import Vector
+
+Metric = Callable[[Vector, Vector], float]
+
+def euclidean_distance(v: Vector, w: Vector) -> float:
+    """Exactly the value of vector_operations.distance (which knn_classify sorts by),
+    without the length check and copies"""
+    return math.sqrt(sum([d * d for d in map(sub, v, w)]))
+
+def hamming_distance(v: Vector, w: Vector) -> float:
+    """Number of positions where v and w differ, like clustering.num_differences"""
+    return sum(1 for x1, x2 in zip(v, w) if x1 != x2)
+
+def angular_distance(v: Vector, w: Vector) -> float:
+    """The angle between v and w divided by pi. Ranks neighbors like cosine distance,
+    but unlike 1 - cosine similarity it satisfies the triangle inequality."""
+    dot = sum(v_i * w_i for v_i, w_i in zip(v, w))
+    norms = math.sqrt(sum(v_i * v_i for v_i in v) * sum(w_i * w_i for w_i in w))
+    if norms == 0:
+        return 0.0 if dot == 0 else 1.0
+    return math.acos(max(-1.0, min(1.0, dot / norms))) / math.pi
+
+class _Leaf(NamedTuple):
+    indices: List[int]
+
+class _Node(NamedTuple):
+    vantage: int        # index of the vantage point
+    radius: float       # median distance from the vantage point
+    inside: Any         # points at distance <= radius
+    outside: Any        # points at distance >= radius
+
+Node = Union[_Leaf, _Node]
+
+class VPTree:
+    def __init__(self, labeled_points: Sequence[Any],
+                 metric: Metric = euclidean_distance,
+                 leaf_size: int = 8,
+                 rng: random.Random = random) -> None:
+        """metric must satisfy the triangle inequality and, to save the tree,
+        be defined at module level"""
+        self.items = list(labeled_points)
+        self.metric = metric
+        self.leaf_size = leaf_size
+        self.num_distances = 0      # distance computations, for benchmarking
+        self.root = self._build(list(range(len(self.items))), rng)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _point(self, i: int) -> Vector:
+        return self.items[i].point
+
+    def _build(self, indices: List[int], rng: random.Random) -> Node:
+        if len(indices) <= self.leaf_size:
+            return _Leaf(indices)
+        vantage = indices.pop(rng.randrange(len(indices)))
+        vantage_point = self._point(vantage)
+        by_distance = sorted(indices, key=lambda i: self.metric(self._point(i), vantage_point))
+        mid = len(by_distance) // 2
+        radius = self.metric(self._point(by_distance[mid]), vantage_point)
+        return _Node(vantage, radius,
+                     self._build(by_distance[:mid], rng),
+                     self._build(by_distance[mid:], rng))
+
+    def nearest(self, query: Vector, k: int) -> List[Tuple[float, Any]]:
+        """The k nearest (distance, item) pairs, nearest first"""
+        metric, items = self.metric, self.items
+        # the k best so far as (-distance, -index), so heap[0] is the one to replace
+        heap: List[Tuple[float, int]] = []
+
+        def consider(i: int) -> float:
+            d = metric(items[i].point, query)
+            entry = (-d, -i)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            return d
+
+        def tau() -> float:
+            return -heap[0][0] if len(heap) == k else math.inf
+
+        def search(node: Node) -> None:
+            if isinstance(node, _Leaf):
+                self.num_distances += len(node.indices)
+                for i in node.indices:
+                    consider(i)
+                return
+            self.num_distances += 1
+            d = consider(node.vantage)
+            # by the triangle inequality, nothing inside is closer than d - radius
+            # and nothing outside is closer than radius - d (give or take rounding)
+            slack = 1e-9 * (d + node.radius)
+            if d <= node.radius:
+                search(node.inside)
+                if d + tau() + slack >= node.radius:
+                    search(node.outside)
+            else:
+                search(node.outside)
+                if d - tau() - slack <= node.radius:
+                    search(node.inside)
+
+        if k > 0:
+            search(self.root)
+        return [(-d, items[-i]) for d, i in sorted(heap, reverse=True)]
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> 'VPTree':
+        with open(path, 'rb') as f:
+            tree = pickle.load(f)
+        assert isinstance(tree, VPTree), f"{path} doesn't contain a VPTree"
+        return tree
+
+class _Point(NamedTuple):
+    point: Vector
+    label: str
+
+def _brute_force(points: List[_Point], query: Vector, k: int, metric: Metric) -> List[_Point]:
+    return sorted(points, key=lambda p: metric(p.point, query))[:k]
+
+rng = random.Random(0)
+
+# euclidean and angular distances in 10 dimensions
+points = [_Point([rng.gauss(0, 1) for _ in range(10)], rng.choice("ab")) for _ in range(1000)]
+for metric in [euclidean_distance, angular_distance]:
+    tree = VPTree(points, metric, rng=rng)
+    for _ in range(10):
+        query = [rng.gauss(0, 1) for _ in range(10)]
+        assert [p for _, p in tree.nearest(query, 5)] == _brute_force(points, query, 5, metric)
+
+# hamming distance on categorical features
+colors = ["red", "green", "blue"]
+records = [_Point([rng.choice(colors) for _ in range(6)], str(i)) for i in range(500)]
+tree = VPTree(records, hamming_distance, rng=rng)
+query = [rng.choice(colors) for _ in range(6)]
+assert ([d for d, _ in tree.nearest(query, 10)] ==
+        [hamming_distance(p.point, query) for p in _brute_force(records, query, 10, hamming_distance)])
+
+# a saved tree answers queries the same way
+import os
+import tempfile
+path = os.path.join(tempfile.mkdtemp(), "tree.pickle")
+tree.save(path)
+loaded = VPTree.load(path)
+assert loaded.nearest(query, 10) == tree.nearest(query, 10)
+os.remove(path)
+os.rmdir(os.path.dirname(path))
@@ -0,0 +1,65 @@
+"""
+Description: Batch p-values for many test statistics at once (e.g. all regression coefficients or all
+metrics of an experiment) and the Bonferroni and Benjamini-Hochberg corrections for multiple testing.
+Both corrections need at most one sort, so they run in O(n log n).
+
+Reference: Chapter 7 : Hypothesis and Inference, Chapter 15 : Multiple Regression
+"""
+
+import math
+from typing import List
+
+Vector = List[float]
+
+def normal_cdf_many(xs: Vector, mu: float = 0, sigma: float = 1) -> Vector:
+    """normal_cdf evaluated at every point of xs"""
+    scale = 1 / (math.sqrt(2) * sigma)
+    # erfc keeps precision far out in the lower tail, where 1 + erf(z) would round to 0
+    return [math.erfc(-(x - mu) * scale) / 2 for x in xs]
+
+def two_sided_p_values(xs: Vector, mu: float = 0, sigma: float = 1) -> Vector:
+    """two_sided_p_value for every statistic in xs"""
+    # the two-sided p-value is twice the tail beyond |x - mu|
+    return [2 * p for p in normal_cdf_many([mu - abs(x - mu) for x in xs], mu, sigma)]
+
+def p_values(beta_hats: Vector, sigma_hats: Vector) -> Vector:
+    """p_value for every (coefficient, standard error) pair"""
+    assert len(beta_hats) == len(sigma_hats), "need one standard error per coefficient"
+    return two_sided_p_values([beta_hat / sigma_hat
+                               for beta_hat, sigma_hat in zip(beta_hats, sigma_hats)])
+
+def bonferroni(ps: Vector) -> Vector:
+    """Bonferroni-adjusted p-values (controls the family-wise error rate)"""
+    n = len(ps)
+    return [min(1.0, n * p) for p in ps]
+
+def benjamini_hochberg(ps: Vector) -> Vector:
+    """Benjamini-Hochberg adjusted p-values (q-values), which control the false discovery rate"""
+    n = len(ps)
+    order = sorted(range(n), key=lambda i: ps[i])   # the only O(n log n) step
+
+    adjusted = [0.0] * n
+    running_min = 1.0
+    # walk from the largest p-value down, keeping the adjusted values monotone
+    for rank in range(n, 0, -1):
+        i = order[rank - 1]
+        running_min = min(running_min, ps[i] * n / rank)
+        adjusted[i] = running_min
+    return adjusted
+
+def reject(adjusted_ps: Vector, alpha: float = 0.05) -> List[bool]:
+    """Which hypotheses are rejected at level alpha"""
+    return [p <= alpha for p in adjusted_ps]
+
+# agrees with two_sided_p_value(-1.14) ~ 0.254 from hypothesis testing
+assert 0.253 < two_sided_p_values([-1.14])[0] < 0.255
+assert two_sided_p_values([1.5])[0] == two_sided_p_values([-1.5])[0]
+
+# agrees with p_value(0.923, 1.249) from multiple regression
+assert abs(p_values([0.923], [1.249])[0] - 2 * (1 - normal_cdf_many([0.923 / 1.249])[0])) < 1e-12
+
+ps = [0.01, 0.04, 0.03, 0.005]
+assert bonferroni(ps) == [0.04, 0.16, 0.12, 0.02]
+q_values = benjamini_hochberg(ps)
+assert all(abs(q - e) < 1e-12 for q, e in zip(q_values, [0.02, 0.04, 0.04, 0.02]))
+assert reject(q_values, 0.03) == [True, False, False, True]
@@ -0,0 +1,77 @@
+"""
+Description: Online multiple regression with recursive least squares. Every new (x, y) observation updates
+beta in O(d^2) time, so the model is always up to date without refitting from a random guess. An optional
+forgetting factor below 1 down-weights old observations so the model can follow drifting data.
+
+As in multiple_regression, the first element of every x is assumed to be 1 (the intercept).
+
+Reference: Chapter 15 : Multiple Regression
+"""
+
+from typing import Iterable
+
+from vector_operations import Vector, dot
+
+class RecursiveLeastSquares:
+    def __init__(self, num_features: int,
+                 forgetting_factor: float = 1.0,
+                 initial_variance: float = 1e6) -> None:
+        """initial_variance is how unsure we are about the starting beta of all zeros,
+        forgetting_factor = 1 weighs all observations equally"""
+        assert 0 < forgetting_factor <= 1, "forgetting_factor must be in (0, 1]"
+        self.num_features = num_features
+        self.forgetting_factor = forgetting_factor
+        self.beta = [0.0] * num_features
+        # P is (proportional to) the inverse of X'X, kept up to date as rows arrive
+        self.P = [[initial_variance if i == j else 0.0 for j in range(num_features)]
+                  for i in range(num_features)]
+        self.num_observations = 0
+
+    def predict(self, x: Vector) -> float:
+        return dot(x, self.beta)
+
+    def error(self, x: Vector, y: float) -> float:
+        return self.predict(x) - y
+
+    def update(self, x: Vector, y: float) -> None:
+        """Folds one observation into beta in O(d^2)"""
+        assert len(x) == self.num_features, "x has the wrong number of features"
+        lam = self.forgetting_factor
+        Px = [dot(row, x) for row in self.P]
+        gain_denominator = lam + dot(x, Px)
+        gain = [p / gain_denominator for p in Px]
+
+        residual = y - self.predict(x)
+        self.beta = [b + g * residual for b, g in zip(self.beta, gain)]
+
+        # P <- (P - gain Px') / lambda; P stays symmetric
+        self.P = [[(p_ij - g_i * px_j) / lam for p_ij, px_j in zip(row, Px)]
+                  for row, g_i in zip(self.P, gain)]
+        self.num_observations += 1
+
+    def update_many(self, xs: Iterable[Vector], ys: Iterable[float]) -> None:
+        for x, y in zip(xs, ys):
+            self.update(x, y)
+
+import random
+rng = random.Random(0)
+xs = [[1.0, rng.random(), rng.random()] for _ in range(500)]
+ys = [2 + 3 * x[1] - x[2] + rng.gauss(0, 0.1) for x in xs]
+
+model = RecursiveLeastSquares(3)
+model.update_many(xs[:250], ys[:250])
+halfway = list(model.beta)
+model.update_many(xs[250:], ys[250:])
+
+# agrees with the batch least squares solution on the same data
+from regression_stats import RegressionAccumulator
+stats = RegressionAccumulator(3)
+stats.add_rows(xs, ys)
+assert all(abs(b - b_hat) < 1e-4 for b, b_hat in zip(model.beta, stats.coefficients()))
+assert all(abs(b - true_b) < 0.1 for b, true_b in zip(halfway, [2, 3, -1]))
+
+# with forgetting, the model follows a change in the data
+drifting = RecursiveLeastSquares(2, forgetting_factor=0.9)
+drifting.update_many([[1.0, x / 10] for x in range(100)], [1 + 2 * x / 10 for x in range(100)])
+drifting.update_many([[1.0, x / 10] for x in range(100)], [1 - 2 * x / 10 for x in range(100)])
+assert abs(drifting.beta[1] + 2) < 0.01
@@ -0,0 +1,211 @@
+"""
+Description: Optimizers for the functional gradient_step style of training: plain steps, momentum, Adam,
+backtracking line search and L-BFGS, together with stopping rules based on the gradient norm, the relative
+change of the loss, or a patience counter. Training stops once the fit has converged instead of running a
+fixed number of epochs.
+
+Reference: Chapter 8 : Gradient Descent
+"""
+
+import math
+from typing import Callable, List, Optional, Tuple
+
+from vector_operations import Vector, add, subtract, scalar_mulitply, dot, magnitude
+
+class Optimizer:
+    """Turns the current parameters and gradient into new parameters"""
+    def step(self, theta: Vector, gradient: Vector) -> Vector:
+        raise NotImplementedError
+
+class GradientStep(Optimizer):
+    def __init__(self, learning_rate: float = 0.001) -> None:
+        self.lr = learning_rate
+
+    def step(self, theta: Vector, gradient: Vector) -> Vector:
+        return add(theta, scalar_mulitply(-self.lr, gradient))
+
+class Momentum(Optimizer):
+    def __init__(self, learning_rate: float = 0.001, momentum: float = 0.9) -> None:
+        self.lr = learning_rate
+        self.mo = momentum
+        self.update: Optional[Vector] = None # running average of gradients
+
+    def step(self, theta: Vector, gradient: Vector) -> Vector:
+        if self.update is None:
+            self.update = [0.0 for _ in gradient]
+        self.update = [self.mo * u + (1 - self.mo) * g
+                       for u, g in zip(self.update, gradient)]
+        return add(theta, scalar_mulitply(-self.lr, self.update))
+
+class Adam(Optimizer):
+    def __init__(self, learning_rate: float = 0.001,
+                 beta1: float = 0.9, beta2: float = 0.999,
+                 epsilon: float = 1e-8) -> None:
+        self.lr = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.m: Optional[Vector] = None # first moment
+        self.v: Optional[Vector] = None # second moment
+        self.t = 0
+
+    def step(self, theta: Vector, gradient: Vector) -> Vector:
+        if self.m is None:
+            self.m = [0.0 for _ in gradient]
+            self.v = [0.0 for _ in gradient]
+        self.t += 1
+        self.m = [self.beta1 * m + (1 - self.beta1) * g for m, g in zip(self.m, gradient)]
+        self.v = [self.beta2 * v + (1 - self.beta2) * g * g for v, g in zip(self.v, gradient)]
+        # correct the bias towards zero of the early moment estimates
+        m_scale = 1 / (1 - self.beta1 ** self.t)
+        v_scale = 1 / (1 - self.beta2 ** self.t)
+        return [theta_i - self.lr * m * m_scale / (math.sqrt(v * v_scale) + self.epsilon)
+                for theta_i, m, v in zip(theta, self.m, self.v)]
+
+class Convergence:
+    """Decides when to stop. Training stops when any of these hold:
+    the gradient norm is below grad_tol, the loss changed by less than
+    rel_tol (relative) for `patience` steps in a row, or max_steps were taken."""
+    def __init__(self, grad_tol: float = 1e-6, rel_tol: float = 1e-9,
+                 patience: int = 20, max_steps: int = 10000) -> None:
+        self.grad_tol = grad_tol
+        self.rel_tol = rel_tol
+        self.patience = patience
+        self.max_steps = max_steps
+        self.num_steps = 0
+        self.best_loss = math.inf
+        self.num_bad_steps = 0
+
+    def done(self, loss: float, gradient: Vector) -> bool:
+        self.num_steps += 1
+        if magnitude(gradient) < self.grad_tol or self.num_steps >= self.max_steps:
+            return True
+        # a step only counts as progress if it improves the best loss by rel_tol
+        if (self.best_loss == math.inf or
+                loss < self.best_loss - self.rel_tol * max(abs(self.best_loss), 1e-12)):
+            self.best_loss = loss
+            self.num_bad_steps = 0
+        else:
+            self.num_bad_steps += 1
+        return self.num_bad_steps >= self.patience
+
+def minimize(f: Callable[[Vector], float],
+             gradient_fn: Callable[[Vector], Vector],
+             theta: Vector,
+             optimizer: Optional[Optimizer] = None,
+             convergence: Optional[Convergence] = None) -> Tuple[Vector, int]:
+    """Runs optimizer steps until convergence. Returns the parameters and the number of steps."""
+    optimizer = optimizer or GradientStep()
+    convergence = convergence or Convergence()
+    while True:
+        gradient = gradient_fn(theta)
+        if convergence.done(f(theta), gradient):
+            return theta, convergence.num_steps
+        theta = optimizer.step(theta, gradient)
+
+def backtracking_line_search(f: Callable[[Vector], float],
+                             theta: Vector,
+                             gradient: Vector,
+                             direction: Vector,
+                             f_theta: Optional[float] = None,
+                             step_size: float = 1.0,
+                             shrink: float = 0.5,
+                             c: float = 1e-4,
+                             max_halvings: int = 50) -> float:
+    """Shrinks step_size until f decreases enough along direction (the Armijo condition)"""
+    if f_theta is None:
+        f_theta = f(theta)
+    slope = dot(gradient, direction)   # negative for a descent direction
+    for _ in range(max_halvings):
+        if f(add(theta, scalar_mulitply(step_size, direction))) <= f_theta + c * step_size * slope:
+            return step_size
+        step_size *= shrink
+    return step_size
+
+def line_search_minimize(f: Callable[[Vector], float],
+                         gradient_fn: Callable[[Vector], Vector],
+                         theta: Vector,
+                         convergence: Optional[Convergence] = None) -> Tuple[Vector, int]:
+    """Steepest descent, picking every step size with a backtracking line search"""
+    convergence = convergence or Convergence()
+    step_size = 1.0
+    while True:
+        f_theta, gradient = f(theta), gradient_fn(theta)
+        if convergence.done(f_theta, gradient):
+            return theta, convergence.num_steps
+        direction = scalar_mulitply(-1, gradient)
+        # start a little above the last accepted step instead of from scratch
+        step_size = backtracking_line_search(f, theta, gradient, direction,
+                                             f_theta, step_size * 2)
+        theta = add(theta, scalar_mulitply(step_size, direction))
+
+def lbfgs_minimize(f: Callable[[Vector], float],
+                   gradient_fn: Callable[[Vector], Vector],
+                   theta: Vector,
+                   memory: int = 10,
+                   convergence: Optional[Convergence] = None) -> Tuple[Vector, int]:
+    """Limited-memory BFGS: approximates Newton steps from the last `memory`
+    changes in parameters (s) and gradients (y)"""
+    convergence = convergence or Convergence()
+    s_history: List[Vector] = []
+    y_history: List[Vector] = []
+    gradient = gradient_fn(theta)
+    f_theta = f(theta)
+    while not convergence.done(f_theta, gradient):
+        # two-loop recursion for direction = -H * gradient
+        q = list(gradient)
+        alphas = []
+        for s, y in zip(reversed(s_history), reversed(y_history)):
+            rho = 1 / dot(y, s)
+            alpha = rho * dot(s, q)
+            q = subtract(q, scalar_mulitply(alpha, y))
+            alphas.append((rho, alpha))
+        if s_history:
+            q = scalar_mulitply(dot(s_history[-1], y_history[-1]) / dot(y_history[-1], y_history[-1]), q)
+        for (s, y), (rho, alpha) in zip(zip(s_history, y_history), reversed(alphas)):
+            beta = rho * dot(y, q)
+            q = add(q, scalar_mulitply(alpha - beta, s))
+        direction = scalar_mulitply(-1, q)
+
+        if dot(direction, gradient) >= 0:   # not a descent direction, start over
+            s_history, y_history = [], []
+            direction = scalar_mulitply(-1, gradient)
+
+        step_size = backtracking_line_search(f, theta, gradient, direction, f_theta)
+        new_theta = add(theta, scalar_mulitply(step_size, direction))
+        new_gradient = gradient_fn(new_theta)
+        s, y = subtract(new_theta, theta), subtract(new_gradient, gradient)
+        if dot(s, y) > 1e-12:   # keep only pairs with positive curvature
+            s_history.append(s)
+            y_history.append(y)
+            if len(s_history) > memory:
+                s_history.pop(0)
+                y_history.pop(0)
+        theta, gradient, f_theta = new_theta, new_gradient, f(new_theta)
+    return theta, convergence.num_steps
+
+# fit slope = 20 and intercept = 5, as in gradient_descent
+input = [(x, 20*x + 5) for x in range(-50, 50)]
+
+def mse(theta: Vector) -> float:
+    slope, intercept = theta
+    return sum((slope*x + intercept - y) ** 2 for x, y in input) / len(input)
+
+def mse_gradient(theta: Vector) -> Vector:
+    slope, intercept = theta
+    errors = [(slope*x + intercept - y, x) for x, y in input]
+    return [sum(2*e*x for e, x in errors) / len(input),
+            sum(2*e for e, _ in errors) / len(input)]
+
+theta, num_steps = lbfgs_minimize(mse, mse_gradient, [0.0, 0.0])
+assert abs(theta[0] - 20) < 1e-4 and abs(theta[1] - 5) < 1e-4
+print(f"L-BFGS converged in {num_steps} steps (gradient_descent runs 5000 epochs)")
+
+theta, num_steps = line_search_minimize(mse, mse_gradient, [0.0, 0.0],
+                                        Convergence(grad_tol=1e-4))
+assert abs(theta[0] - 20) < 0.01 and abs(theta[1] - 5) < 0.01
+
+# Adam overshoots and oscillates for a while, so give it more patience
+theta, num_steps = minimize(mse, mse_gradient, [0.0, 0.0], Adam(learning_rate=0.2),
+                            Convergence(grad_tol=1e-4, patience=200))
+assert abs(theta[0] - 20) < 0.01 and abs(theta[1] - 5) < 0.01
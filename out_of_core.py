@@ -0,0 +1,158 @@
+"""
+Description: Out-of-core minibatch SGD for data that doesn't fit in memory. Every epoch streams the rows
+again from a CSV or binary float64 file; a background thread parses them, mixes them in a bounded shuffle
+buffer and groups them into minibatches while the main thread computes gradients. Memory use depends on
+buffer_size and batch_size, never on the number of rows.
+
+The per-example gradient functions have the same (x, y, beta) signature as
+multiple_regression.sqerror_gradient and logistic_regression._negative_log_gradient; importable
+copies of both are in gradients.
+
+Reference: Chapter 8 : Gradient Descent, Chapter 15 : Multiple Regression, Chapter 16 : Logistic Regression
+"""
+
+import csv
+import random
+from array import array
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from data_loader import prefetch_iterator, write_matrix
+from gradients import _negative_log_gradient, sqerror_gradient
+from vector_operations import Vector
+
+Example = Tuple[Vector, float]
+RowSource = Callable[[], Iterable[Example]]
+GradientFn = Callable[[Vector, float, Vector], Vector]
+
+def csv_rows(path: str, target_column: int = -1,
+             has_header: bool = True, add_intercept: bool = True) -> Iterator[Example]:
+    """(x, y) for every line of a numeric CSV file, read lazily.
+    With add_intercept each x starts with a constant 1."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        if has_header:
+            next(reader, None)
+        for line in reader:
+            if not line:
+                continue
+            values = [float(value) for value in line]
+            y = values.pop(target_column)
+            yield ([1.0] + values if add_intercept else values), y
+
+def write_binary_rows(path: str, examples: Iterable[Example]) -> None:
+    """Writes every example as float64 values x_1, ..., x_d, y (the data_loader.write_matrix format)"""
+    write_matrix(path, (list(x) + [y] for x, y in examples))
+
+def binary_rows(path: str, num_cols: int, block_rows: int = 4096,
+                add_intercept: bool = True) -> Iterator[Example]:
+    """(x, y) for every row of a file written by write_binary_rows, where num_cols counts
+    the target too. Reads block_rows rows at a time."""
+    block_bytes = 8 * num_cols * block_rows
+    with open(path, 'rb') as f:
+        while True:
+            block = array('d')
+            block.frombytes(f.read(block_bytes))
+            if not block:
+                return
+            assert len(block) % num_cols == 0, "file size is not a whole number of rows"
+            for start in range(0, len(block), num_cols):
+                x = block[start:start + num_cols - 1].tolist()
+                yield ([1.0] + x if add_intercept else x), block[start + num_cols - 1]
+
+def shuffle_buffer(rows: Iterable[Example], buffer_size: int,
+                   rng: random.Random = random) -> Iterator[Example]:
+    """Yields every row once in a random order, holding at most buffer_size rows.
+    Rows far apart in the file are only mixed if the buffer spans them, so a file
+    sorted by y needs either a large buffer or a shuffled copy on disk."""
+    buffer: List[Example] = []
+    for row in rows:
+        if len(buffer) < buffer_size:
+            buffer.append(row)
+            continue
+        i = rng.randrange(buffer_size)
+        buffer[i], row = row, buffer[i]
+        yield row
+    rng.shuffle(buffer)
+    yield from buffer
+
+def batched(rows: Iterable[Example], batch_size: int) -> Iterator[List[Example]]:
+    batch: List[Example] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def sgd_fit(row_source: RowSource,
+            gradient_fn: GradientFn,
+            beta: Vector,
+            learning_rate: float = 0.001,
+            num_epochs: int = 10,
+            batch_size: int = 32,
+            buffer_size: int = 10000,
+            prefetch: int = 8,
+            rng: random.Random = random) -> Vector:
+    """Minibatch SGD over the rows returned by row_source(), which is called once per epoch
+    (e.g. functools.partial(csv_rows, path)). Steps along the mean gradient of each batch."""
+    beta = list(beta)
+    for _ in range(num_epochs):
+        batches = batched(shuffle_buffer(row_source(), buffer_size, rng), batch_size)
+        for batch in prefetch_iterator(batches, prefetch):
+            total = [0.0] * len(beta)
+            for x, y in batch:
+                for j, g in enumerate(gradient_fn(x, y, beta)):
+                    total[j] += g
+            step = learning_rate / len(batch)
+            beta = [b - step * g for b, g in zip(beta, total)]
+    return beta
+
+import os
+import tempfile
+from functools import partial
+
+rng = random.Random(0)
+directory = tempfile.mkdtemp()
+
+# y = 2 + 3 x_1 - x_2, written as a CSV with a header
+csv_path = os.path.join(directory, "linear.csv")
+with open(csv_path, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(["x1", "x2", "y"])
+    for _ in range(2000):
+        x1, x2 = rng.random(), rng.random()
+        writer.writerow([x1, x2, 2 + 3 * x1 - x2 + rng.gauss(0, 0.01)])
+
+beta = sgd_fit(partial(csv_rows, csv_path), sqerror_gradient, [0.0, 0.0, 0.0],
+               learning_rate=0.1, num_epochs=20, buffer_size=500, rng=rng)
+assert all(abs(b - true_b) < 0.05 for b, true_b in zip(beta, [2, 3, -1]))
+
+# every row comes out of the shuffle buffer exactly once
+ys = [y for _, y in csv_rows(csv_path)]
+assert sorted(y for _, y in shuffle_buffer(csv_rows(csv_path), 100, rng)) == sorted(ys)
+
+# logistic regression on a binary file, labels sorted so the buffer has to do the mixing
+binary_path = os.path.join(directory, "logistic.bin")
+points = sorted(([rng.gauss(0, 1), rng.gauss(0, 1)] for _ in range(2000)), key=lambda x: x[0] - x[1])
+write_binary_rows(binary_path, ((x, 1.0 if x[0] - x[1] > 0 else 0.0) for x in points))
+beta = sgd_fit(partial(binary_rows, binary_path, 3), _negative_log_gradient, [0.0, 0.0, 0.0],
+               learning_rate=0.5, num_epochs=10, buffer_size=2000, rng=rng)
+num_correct = sum((sum(x_i * b_i for x_i, b_i in zip(x, beta)) > 0) == (y == 1.0)
+                  for x, y in binary_rows(binary_path, 3))
+assert num_correct / 2000 > 0.97
+
+# an error in the training loop surfaces instead of leaving the parsing thread hanging
+def _failing_gradient(x: Vector, y: float, beta: Vector) -> Vector:
+    raise ValueError("bad gradient")
+
+try:
+    sgd_fit(lambda: [([1.0, i], i) for i in range(288)], _failing_gradient, [0.0, 0.0],
+            batch_size=32, prefetch=8)
+    assert False, "sgd_fit should have raised"
+except ValueError:
+    pass
+
+os.remove(csv_path)
+os.remove(binary_path)
+os.rmdir(directory)
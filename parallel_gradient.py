@@ -0,0 +1,220 @@
+"""
+Description: Data-parallel batch gradients. The dataset is copied once into shared memory and split into
+one shard per worker process. At every step only the current parameters are sent to the workers, each
+worker sums the per-example gradients over its shard, and the partial sums are added up. Works with the
+per-example gradient functions used elsewhere, e.g. the ones in gradients (they must be defined at
+module level so they can be pickled).
+
+Reference: Chapter 8 : Gradient Descent, Chapter 25 : MapReduce
+"""
+
+import multiprocessing as mp
+import sys
+import traceback
+from array import array
+from multiprocessing import shared_memory
+from typing import Callable, List, Sequence, Tuple, Union
+
+from vector_operations import Vector
+
+Row = Union[float, Vector]
+GradientFn = Callable[[Row, float, Vector], Vector]
+
+def _serve_shard(values: memoryview, num_rows: int, num_cols: int, is_scalar: bool,
+                 start: int, end: int, gradient_fn: GradientFn, conn) -> None:
+    """Waits for parameters, replies with the gradient sum over rows [start, end)"""
+    shard = shard_rows(values, num_rows, num_cols, is_scalar, start, end)
+    while True:
+        theta = conn.recv()
+        if theta is None:
+            return
+        total = [0.0 for _ in theta]
+        for x, y in shard:
+            for j, g in enumerate(gradient_fn(x, y, theta)):
+                total[j] += g
+        conn.send(total)
+
+def _shard_worker(shm_name: str, num_rows: int, num_cols: int, is_scalar: bool,
+                  start: int, end: int, gradient_fn: GradientFn, conn) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = shm.buf.cast('d')
+    # all the views into the buffer are gone once _serve_shard returns,
+    # or once its exception (whose traceback holds them) has been handled
+    failed = False
+    try:
+        _serve_shard(values, num_rows, num_cols, is_scalar, start, end, gradient_fn, conn)
+    except Exception:
+        traceback.print_exc()
+        failed = True
+    values.release()
+    shm.close()
+    conn.close()    # the parent's recv() raises EOFError instead of waiting
+    if failed:
+        sys.exit(1)
+
+def share_dataset(xs: Sequence[Row], ys: Sequence[float]
+                  ) -> Tuple[shared_memory.SharedMemory, int, int, bool]:
+    """Copies rows and then targets into a new shared memory block of float64s.
+    Returns the block, the number of rows and columns, and whether rows are scalars."""
+    assert len(xs) == len(ys) and xs, "need one target per row"
+    num_rows = len(xs)
+    is_scalar = not isinstance(xs[0], (list, tuple, array))
+    num_cols = 1 if is_scalar else len(xs[0])
+    # a ragged row would shift every later value in the buffer
+    assert is_scalar or all(len(x) == num_cols for x in xs), \
+        f"every row should have {num_cols} values"
+
+    shm = shared_memory.SharedMemory(create=True, size=8 * (num_rows * num_cols + num_rows))
+    values = shm.buf.cast('d')
+    try:
+        k = 0
+        for x in xs:
+            if is_scalar:
+                values[k] = x
+                k += 1
+            else:
+                for x_j in x:
+                    values[k] = x_j
+                    k += 1
+        for y in ys:
+            values[k] = y
+            k += 1
+    except BaseException:
+        values.release()
+        shm.close()
+        shm.unlink()
+        raise
+    values.release()
+    return shm, num_rows, num_cols, is_scalar
+
+def shard_rows(values: memoryview, num_rows: int, num_cols: int, is_scalar: bool,
+               start: int, end: int) -> List[Tuple[Row, float]]:
+    """(x, y) pairs for rows [start, end) of a shared dataset, as views into the buffer"""
+    ys = values[num_rows * num_cols:]
+    if is_scalar:
+        rows = [values[i] for i in range(start, end)]
+    else:
+        rows = [values[i * num_cols:(i + 1) * num_cols] for i in range(start, end)]
+    return list(zip(rows, ys[start:end]))
+
+class DataParallelGradient:
+    """Computes mean (or summed) gradients over a dataset using worker processes.
+    Use it as a context manager, or call close() when done."""
+    def __init__(self, xs: Sequence[Row], ys: Sequence[float],
+                 gradient_fn: GradientFn, num_workers: int = 4) -> None:
+        self.shm, self.num_rows, self.num_cols, self.is_scalar = share_dataset(xs, ys)
+
+        num_workers = max(1, min(num_workers, self.num_rows))
+        bounds = [self.num_rows * w // num_workers for w in range(num_workers + 1)]
+        self.connections = []
+        self.workers = []
+        for start, end in zip(bounds, bounds[1:]):
+            parent_conn, child_conn = mp.Pipe()
+            worker = mp.Process(target=_shard_worker,
+                                args=(self.shm.name, self.num_rows, self.num_cols,
+                                      self.is_scalar, start, end, gradient_fn, child_conn),
+                                daemon=True)
+            worker.start()
+            child_conn.close()   # the worker holds its own copy
+            self.connections.append(parent_conn)
+            self.workers.append(worker)
+
+    def gradient(self, theta: Vector, average: bool = True) -> Vector:
+        """Mean of gradient_fn(x, y, theta) over the dataset (the sum if average is False)"""
+        for conn in self.connections:      # broadcast
+            conn.send(theta)
+        total = [0.0 for _ in theta]
+        for conn in self.connections:      # reduce
+            for j, g in enumerate(conn.recv()):
+                total[j] += g
+        if average:
+            return [g / self.num_rows for g in total]
+        return total
+
+    def close(self) -> None:
+        """Stops the workers and frees the shared memory, even if some worker already died"""
+        try:
+            for conn in self.connections:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, EOFError, OSError):
+                    pass    # that worker is already gone
+                conn.close()
+            for worker in self.workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        finally:
+            self.shm.close()
+            self.shm.unlink()
+
+    def __enter__(self) -> 'DataParallelGradient':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+if __name__ == "__main__":
+    import random
+    import time
+    from gradients import linear_gradient, sqerror_gradient
+    from vector_operations import add, scalar_mulitply
+
+    # the same slope = 20, intercept = 5 problem as in gradient_descent
+    input = [(x, 20*x + 5) for x in range(-50, 50)]
+    xs = [x for x, _ in input]
+    ys = [y for _, y in input]
+    theta = [random.uniform(-1, 1), random.uniform(-1, 1)]
+    with DataParallelGradient(xs, ys, linear_gradient, num_workers=2) as executor:
+        for epoch in range(5000):
+            theta = add(theta, scalar_mulitply(-0.001, executor.gradient(theta)))
+    assert 19.9 < theta[0] < 20.1 and 4.9 < theta[1] < 5.1
+
+    # rows of different lengths are rejected up front
+    try:
+        share_dataset([[1.0, 2.0], [3.0], [4.0, 5.0]], [1.0, 2.0, 3.0])
+        assert False, "ragged rows should have been rejected"
+    except AssertionError as e:
+        assert "2 values" in str(e)
+
+    # a worker that dies doesn't stop close() from freeing the shared memory
+    def failing_gradient(x: float, y: float, theta: Vector) -> Vector:
+        raise ValueError("bad gradient")
+
+    executor = DataParallelGradient(xs, ys, failing_gradient, num_workers=2)
+    try:
+        executor.gradient(theta)
+        assert False, "the workers should have failed"
+    except EOFError:
+        pass
+    executor.close()
+    try:
+        shared_memory.SharedMemory(name=executor.shm.name)
+        assert False, "the shared memory should be gone"
+    except FileNotFoundError:
+        pass
+
+    # serial vs. parallel timing on 10^5 rows
+    random.seed(0)
+    xs = [[1.0] + [random.random() for _ in range(9)] for _ in range(100000)]
+    beta = [random.random() for _ in range(10)]
+    ys = [sum(x_i * b_i for x_i, b_i in zip(x, beta)) for x in xs]
+    guess = [0.0] * 10
+
+    start = time.perf_counter()
+    for _ in range(5):
+        total = [0.0] * 10
+        for x, y in zip(xs, ys):
+            for j, g in enumerate(sqerror_gradient(x, y, guess)):
+                total[j] += g
+    serial_time = (time.perf_counter() - start) / 5
+
+    num_workers = mp.cpu_count()
+    with DataParallelGradient(xs, ys, sqerror_gradient, num_workers) as executor:
+        start = time.perf_counter()
+        for _ in range(5):
+            executor.gradient(guess)
+        parallel_time = (time.perf_counter() - start) / 5
+
+    print(f"serial: {serial_time:.3f}s/step, {num_workers} workers: {parallel_time:.3f}s/step")
@@ -0,0 +1,64 @@
+"""
+Description: Reproducible random number streams for parallel workers. A root seed spawns independent
+child streams (one per worker or task), each of which can spawn its own children, so every worker gets
+its own sequence without sharing the global random state. Functions like split_data, minibatches,
+random_tensor and kMeans.train accept one of these streams through their rng argument.
+
+Reference: Chapter 6 : Probability
+"""
+
+import hashlib
+import random
+from typing import List, Tuple
+
+def _derive_seed(root_seed: int, path: Tuple[int, ...]) -> int:
+    """Hashes the root seed together with the spawn path, so that
+    streams with different paths have unrelated seeds"""
+    key = ",".join(str(i) for i in (root_seed,) + path).encode()
+    return int.from_bytes(hashlib.sha256(key).digest(), "big")
+
+class RandomStream(random.Random):
+    """A random.Random that knows where it sits in the spawn tree of a root seed"""
+    def __init__(self, root_seed: int = 0, path: Tuple[int, ...] = ()) -> None:
+        self.root_seed = root_seed
+        self.path = path
+        self.num_spawned = 0
+        super().__init__(_derive_seed(root_seed, path))
+
+    def spawn(self, n: int) -> List['RandomStream']:
+        """Creates n new independent child streams"""
+        children = [RandomStream(self.root_seed, self.path + (self.num_spawned + i,))
+                    for i in range(n)]
+        self.num_spawned += n
+        return children
+
+    def jumped(self, jumps: int = 1) -> 'RandomStream':
+        """Returns the sibling stream 'jumps' positions further along.
+        Worker i can call root.spawn(1)[0].jumped(i) without coordinating with the others."""
+        assert self.path, "the root stream has no siblings"
+        return RandomStream(self.root_seed, self.path[:-1] + (self.path[-1] + jumps,))
+
+    def __reduce__(self):
+        # pickle as (seed, path, state) so streams can be sent to worker processes
+        return (_restore_stream, (self.root_seed, self.path, self.num_spawned, self.getstate()))
+
+def _restore_stream(root_seed: int, path: Tuple[int, ...],
+                    num_spawned: int, state: tuple) -> RandomStream:
+    stream = RandomStream(root_seed, path)
+    stream.num_spawned = num_spawned
+    stream.setstate(state)
+    return stream
+
+def worker_streams(root_seed: int, num_workers: int) -> List[RandomStream]:
+    """One independent stream per worker"""
+    return RandomStream(root_seed).spawn(num_workers)
+
+streams = worker_streams(0, 4)
+assert len({stream.random() for stream in streams}) == 4   # all different
+
+# the same root seed always gives the same streams
+assert [s.random() for s in worker_streams(0, 4)] == [s.random() for s in worker_streams(0, 4)]
+
+# jumping to the i-th sibling gives the same stream as spawning it
+first = RandomStream(0).spawn(1)[0]
+assert first.jumped(3).random() == worker_streams(0, 4)[3].random()
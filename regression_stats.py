@@ -0,0 +1,151 @@
+"""
+Description: Least squares regression from sufficient statistics. A RegressionAccumulator reads every row
+once and only keeps n, the means of x and y and the sums of products of their deviations from the means
+(X'X, X'y and y'y of the centered data). From those it produces coefficients, R-squared and the residual
+variance for any subset of the features without going back to the data, and accumulators built on
+separate partitions of the data can be merged. Centering keeps the fit accurate when y or the features
+have a large offset, where raw sums like y'y would swamp the residuals.
+
+As in multiple_regression, the first element of every x is assumed to be 1 (the intercept).
+
+Reference: Chapter 14 : Simple Linear Regression, Chapter 15 : Multiple Regression
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from matrix_operations import Matrix, solve
+from vector_operations import Vector
+
+class RegressionAccumulator:
+    def __init__(self, num_features: int) -> None:
+        self.num_features = num_features
+        self.n = 0
+        self.x_means: Vector = [0.0] * num_features
+        self.y_mean = 0.0
+        # sums of products of deviations from the means, upper half only for X
+        self.cxx: Matrix = [[0.0] * num_features for _ in range(num_features)]
+        self.cxy: Vector = [0.0] * num_features
+        self.cyy = 0.0
+
+    def add(self, x: Vector, y: float) -> None:
+        """Adds one observation in O(d^2), updating the means and co-moments as in Welford's algorithm"""
+        assert len(x) == self.num_features, "x has the wrong number of features"
+        self.n += 1
+        dx = [x_i - m_i for x_i, m_i in zip(x, self.x_means)]
+        dy = y - self.y_mean
+        weight = (self.n - 1) / self.n
+        for i, dx_i in enumerate(dx):
+            self.x_means[i] += dx_i / self.n
+            if dx_i == 0:
+                continue
+            row = self.cxx[i]
+            for j in range(i, self.num_features):
+                row[j] += weight * dx_i * dx[j]
+            self.cxy[i] += weight * dx_i * dy
+        self.y_mean += dy / self.n
+        self.cyy += weight * dy * dy
+
+    def add_rows(self, xs: Iterable[Vector], ys: Iterable[float]) -> None:
+        for x, y in zip(xs, ys):
+            self.add(x, y)
+
+    def __add__(self, other: 'RegressionAccumulator') -> 'RegressionAccumulator':
+        """Statistics of the union of both partitions (Chan et al.'s pairwise update)"""
+        assert self.num_features == other.num_features, "different numbers of features"
+        merged = RegressionAccumulator(self.num_features)
+        merged.n = self.n + other.n
+        if merged.n == 0:
+            return merged
+        share = other.n / merged.n
+        weight = self.n * share
+        dx = [b - a for a, b in zip(self.x_means, other.x_means)]
+        dy = other.y_mean - self.y_mean
+        merged.x_means = [m + share * d for m, d in zip(self.x_means, dx)]
+        merged.y_mean = self.y_mean + share * dy
+        merged.cxx = [[a + b + weight * dx[i] * dx[j] for j, (a, b) in enumerate(zip(row, other_row))]
+                      for i, (row, other_row) in enumerate(zip(self.cxx, other.cxx))]
+        merged.cxy = [a + b + weight * d * dy for a, b, d in zip(self.cxy, other.cxy, dx)]
+        merged.cyy = self.cyy + other.cyy + weight * dy * dy
+        return merged
+
+    def _cxx(self, i: int, j: int) -> float:
+        return self.cxx[i][j] if i <= j else self.cxx[j][i]
+
+    def _fit(self, features: List[int]) -> Tuple[Vector, float]:
+        """Coefficients in the order of features, and the sum of squared errors"""
+        if 0 in features:
+            # with an intercept, the other coefficients solve the centered normal equations
+            # and never see the large sums that make the raw ones lose precision
+            others = [i for i in features if i != 0]
+            A = [[self._cxx(i, j) for j in others] for i in others]
+            slopes = solve(A, [self.cxy[i] for i in others]) if others else []
+            intercept = self.y_mean - sum(b * self.x_means[i] for b, i in zip(slopes, others))
+            by_feature = {**dict(zip(others, slopes)), 0: intercept}
+            sse = self.cyy - sum(b * self.cxy[i] for b, i in zip(slopes, others))
+            return [by_feature[i] for i in features], max(0.0, sse)
+
+        # no intercept: rebuild X'X, X'y and y'y from the means and co-moments
+        n = self.n
+        A = [[self._cxx(i, j) + n * self.x_means[i] * self.x_means[j] for j in features]
+             for i in features]
+        b = [self.cxy[i] + n * self.x_means[i] * self.y_mean for i in features]
+        beta = solve(A, b)
+        yty = self.cyy + n * self.y_mean ** 2
+        return beta, max(0.0, yty - sum(beta_j * b_j for beta_j, b_j in zip(beta, b)))
+
+    def coefficients(self, features: Optional[List[int]] = None) -> Vector:
+        """Least squares beta using only the given feature indices (default: all of them).
+        Coefficients are returned in the order of features."""
+        features = list(range(self.num_features)) if features is None else features
+        return self._fit(features)[0]
+
+    def sum_of_squared_errors(self, features: Optional[List[int]] = None) -> float:
+        features = list(range(self.num_features)) if features is None else features
+        return self._fit(features)[1]
+
+    def total_sum_of_squares(self) -> float:
+        return self.cyy
+
+    def r_squared(self, features: Optional[List[int]] = None) -> float:
+        return 1.0 - self.sum_of_squared_errors(features) / self.total_sum_of_squares()
+
+    def residual_variance(self, features: Optional[List[int]] = None) -> float:
+        """Unbiased estimate of the noise variance"""
+        num_params = self.num_features if features is None else len(features)
+        return self.sum_of_squared_errors(features) / (self.n - num_params)
+
+# y = 3x - 5 exactly, as in linear_regression
+stats = RegressionAccumulator(2)
+stats.add_rows([[1.0, x] for x in range(-100, 110, 10)],
+               [3 * x - 5 for x in range(-100, 110, 10)])
+alpha, beta = stats.coefficients()
+assert abs(alpha + 5) < 1e-9 and abs(beta - 3) < 1e-9
+assert abs(stats.r_squared() - 1) < 1e-9
+
+# merging two partitions gives the same fit as one pass over everything
+import random
+rng = random.Random(0)
+xs = [[1.0, rng.random(), rng.random()] for _ in range(200)]
+ys = [2 + 3 * x[1] - x[2] + rng.gauss(0, 0.1) for x in xs]
+left, right = RegressionAccumulator(3), RegressionAccumulator(3)
+left.add_rows(xs[:120], ys[:120])
+right.add_rows(xs[120:], ys[120:])
+everything = RegressionAccumulator(3)
+everything.add_rows(xs, ys)
+assert all(abs(a - b) < 1e-9 for a, b in zip((left + right).coefficients(), everything.coefficients()))
+assert 0.005 < everything.residual_variance() < 0.02
+
+# a sub-model with only the intercept and the first feature, no second pass needed
+assert everything.r_squared([0, 1]) < everything.r_squared()
+
+# y around 10^6 with noise of standard deviation 0.1: raw sums of squares would be ~10^15
+# and lose most of the residuals to rounding, centered ones still give a variance of about 0.01
+xs = [[1.0, 1000 + rng.random()] for _ in range(1000)]
+ys = [1e6 + 2 * x[1] + rng.gauss(0, 0.1) for x in xs]
+offset = RegressionAccumulator(2)
+offset.add_rows(xs[:400], ys[:400])
+rest = RegressionAccumulator(2)
+rest.add_rows(xs[400:], ys[400:])
+for fitted in [offset + rest, RegressionAccumulator(2) + offset + rest]:
+    assert 0.008 < fitted.residual_variance() < 0.012
+    assert abs(fitted.coefficients()[1] - 2) < 0.05
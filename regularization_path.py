@@ -0,0 +1,169 @@
+"""
+Description: Whole regularization paths for ridge, lasso and elastic net regression. The data is read once
+to build the (centered) Gram matrix X'X/n and X'y/n. Ridge then needs a single eigendecomposition, after
+which every alpha costs O(d^2). Lasso and elastic net use coordinate descent on the Gram matrix, walking
+from the largest alpha down and warm-starting each fit from the previous solution.
+
+The objective matches the penalties in multiple_regression, with the intercept (the first element
+of every x is 1) left unpenalized:
+    mean squared error + alpha * (l1_ratio * sum |beta_j| + (1 - l1_ratio) * sum beta_j ** 2)
+so l1_ratio = 1 is lasso_penlty and l1_ratio = 0 is ridge_penalty.
+
+Reference: Chapter 15 : Multiple Regression
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+from matrix_operations import Matrix, symmetric_eigen
+from vector_operations import Vector
+
+class GramStatistics(NamedTuple):
+    """Centered second moments of the data, everything a path needs"""
+    gram: Matrix          # X'X / n of the centered features (without the constant)
+    xty: Vector           # X'y / n of the centered features and target
+    x_means: Vector
+    y_mean: float
+
+def gram_statistics(xs: List[Vector], ys: Vector) -> GramStatistics:
+    """One pass (plus the means) over the data. Drops the constant first column."""
+    n = len(xs)
+    d = len(xs[0]) - 1
+    x_means = [sum(x[j + 1] for x in xs) / n for j in range(d)]
+    y_mean = sum(ys) / n
+    gram = [[0.0] * d for _ in range(d)]
+    xty = [0.0] * d
+    for x, y in zip(xs, ys):
+        centered = [x[j + 1] - x_means[j] for j in range(d)]
+        y_c = y - y_mean
+        for i, c_i in enumerate(centered):
+            xty[i] += c_i * y_c
+            row = gram[i]
+            for j in range(i, d):
+                row[j] += c_i * centered[j]
+    for i in range(d):
+        xty[i] /= n
+        for j in range(i, d):
+            gram[i][j] /= n
+            gram[j][i] = gram[i][j]
+    return GramStatistics(gram, xty, x_means, y_mean)
+
+def _with_intercept(stats: GramStatistics, beta: Vector) -> Vector:
+    intercept = stats.y_mean - sum(b * m for b, m in zip(beta, stats.x_means))
+    return [intercept] + beta
+
+def ridge_path(xs: List[Vector], ys: Vector, alphas: List[float],
+               stats: Optional[GramStatistics] = None) -> List[Tuple[float, Vector]]:
+    """(alpha, beta) for every alpha, from one eigendecomposition of X'X/n.
+    When the features are collinear, alpha = 0 gives the least squares beta with the smallest norm."""
+    assert all(alpha >= 0 for alpha in alphas), "alpha can't be negative"
+    stats = stats or gram_statistics(xs, ys)
+    eigenvalues, Q = symmetric_eigen(stats.gram)
+    d = len(eigenvalues)
+    # eigenvalues this small are zero up to rounding; X'y has no component along their
+    # eigenvectors, so those directions contribute nothing instead of 0 / 0
+    cutoff = 1e-12 * max([abs(lam) for lam in eigenvalues], default=0.0)
+    # project X'y onto the eigenvectors once
+    projected = [sum(Q[i][k] * stats.xty[i] for i in range(d)) for k in range(d)]
+    path = []
+    for alpha in alphas:
+        scaled = [p / (lam + alpha) if lam + alpha > cutoff else 0.0
+                  for p, lam in zip(projected, eigenvalues)]
+        beta = [sum(Q[i][k] * scaled[k] for k in range(d)) for i in range(d)]
+        path.append((alpha, _with_intercept(stats, beta)))
+    return path
+
+def _soft_threshold(z: float, threshold: float) -> float:
+    if z > threshold: return z - threshold
+    if z < -threshold: return z + threshold
+    return 0.0
+
+def _coordinate_descent(stats: GramStatistics, alpha: float, l1_ratio: float,
+                        beta: Vector, tol: float, max_sweeps: int) -> Vector:
+    """Minimizes the elastic net objective starting from beta (updated in place)"""
+    gram, xty = stats.gram, stats.xty
+    d = len(beta)
+    l1 = alpha * l1_ratio / 2
+    l2 = alpha * (1 - l1_ratio)
+    # correlation of every feature with the current residual: xty - gram @ beta
+    residual_corr = [xty[j] - sum(gram[j][k] * beta[k] for k in range(d)) for j in range(d)]
+    for _ in range(max_sweeps):
+        max_change = 0.0
+        for j in range(d):
+            if gram[j][j] == 0:
+                continue
+            rho = residual_corr[j] + gram[j][j] * beta[j]
+            new_beta_j = _soft_threshold(rho, l1) / (gram[j][j] + l2)
+            change = new_beta_j - beta[j]
+            if change:
+                beta[j] = new_beta_j
+                gram_j = gram[j]
+                for k in range(d):      # O(d) per update, independent of n
+                    residual_corr[k] -= gram_j[k] * change
+                max_change = max(max_change, abs(change))
+        if max_change < tol:
+            break
+    return beta
+
+def max_alpha(stats: GramStatistics, l1_ratio: float = 1.0) -> float:
+    """The smallest alpha at which every (penalized) coefficient is zero"""
+    assert l1_ratio > 0, "without an l1 penalty coefficients never become exactly zero"
+    return 2 * max(abs(c) for c in stats.xty) / l1_ratio
+
+def elastic_net_path(xs: List[Vector], ys: Vector,
+                     alphas: Optional[List[float]] = None,
+                     l1_ratio: float = 1.0,
+                     num_alphas: int = 50,
+                     tol: float = 1e-8,
+                     max_sweeps: int = 1000,
+                     stats: Optional[GramStatistics] = None) -> List[Tuple[float, Vector]]:
+    """(alpha, beta) along a path of alphas, from the largest to the smallest,
+    each fit warm-started from the previous one. l1_ratio = 1 is the lasso.
+    Without alphas, uses num_alphas log-spaced values down to max_alpha / 1000."""
+    stats = stats or gram_statistics(xs, ys)
+    if alphas is None:
+        top = max_alpha(stats, l1_ratio)
+        alphas = [top * 1e-3 ** (i / (num_alphas - 1)) for i in range(num_alphas)]
+    beta = [0.0] * len(stats.xty)
+    path = []
+    for alpha in sorted(alphas, reverse=True):
+        beta = _coordinate_descent(stats, alpha, l1_ratio, beta, tol, max_sweeps)
+        path.append((alpha, _with_intercept(stats, list(beta))))
+    return path
+
+def lasso_path(xs: List[Vector], ys: Vector,
+               alphas: Optional[List[float]] = None, **kwargs) -> List[Tuple[float, Vector]]:
+    return elastic_net_path(xs, ys, alphas, l1_ratio=1.0, **kwargs)
+
+import random
+rng = random.Random(0)
+xs = [[1.0] + [rng.gauss(0, 1) for _ in range(5)] for _ in range(300)]
+true_beta = [4.0, 3.0, -2.0, 0.0, 0.0, 0.5]
+ys = [sum(x_j * b_j for x_j, b_j in zip(x, true_beta)) + rng.gauss(0, 0.5) for x in xs]
+
+stats = gram_statistics(xs, ys)
+
+# with alpha = 0 both solvers reduce to ordinary least squares
+from regression_stats import RegressionAccumulator
+ols = RegressionAccumulator(6)
+ols.add_rows(xs, ys)
+ols_beta = ols.coefficients()
+(_, ridge_0), = ridge_path(xs, ys, [0.0], stats)
+(_, lasso_0), = lasso_path(xs, ys, [0.0], stats=stats)
+assert all(abs(a - b) < 1e-6 for a, b in zip(ridge_0, ols_beta))
+assert all(abs(a - b) < 1e-6 for a, b in zip(lasso_0, ols_beta))
+
+# a duplicated feature makes X'X singular, alpha = 0 then splits its weight evenly
+twins = [x + [x[1]] for x in xs]
+(_, twin_0), = ridge_path(twins, ys, [0.0])
+assert abs(twin_0[1] - twin_0[6]) < 1e-6 and abs(twin_0[1] + twin_0[6] - ols_beta[1]) < 1e-6
+
+# elastic net with l1_ratio = 0 is ridge
+(_, ridge_1), = ridge_path(xs, ys, [1.0], stats)
+(_, enet_1), = elastic_net_path(xs, ys, [1.0], l1_ratio=0.0, stats=stats)
+assert all(abs(a - b) < 1e-6 for a, b in zip(ridge_1, enet_1))
+
+# the lasso path starts with everything zeroed out and drops the irrelevant features first
+path = lasso_path(xs, ys, stats=stats)
+assert all(b == 0 for b in path[0][1][1:])
+alpha, beta = path[len(path) // 2]
+assert beta[3] == 0 and beta[4] == 0 and beta[1] != 0 and beta[2] != 0